@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+numba 可选：装了就 JIT，没装（比如平台环境缺包）就退化成纯 Python，逻辑不变。
+"""
+try:
+    from numba import njit, prange
+except ImportError:
+    def njit(*args, **kwargs):
+        # 兼容 @njit 和 @njit(...) 两种写法
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda f: f
+
+    prange = range
@@ -1,5 +1,20 @@
 # -*- coding: utf-8 -*-
-import numpy as np
+import math
+
+from my_jq_strategy.lib.jit import njit
+
+
+# 标量路径：math.tanh + 手写截断，避免 np.tanh/np.clip 对单个 float 的 ufunc 调度开销
+# 带签名声明 => 导入时即编译，类型固定，调用时不再做类型分派
+@njit("float64(float64, float64, float64)", cache=True)
+def _target_position(signal, max_leverage, k):
+    v = math.tanh(k * signal) * max_leverage
+    if v > max_leverage:
+        v = max_leverage
+    elif v < -max_leverage:
+        v = -max_leverage
+    return v
+
 
 def target_position(signal: float,
                     max_leverage: float = 0.2,
@@ -8,5 +23,4 @@ def target_position(signal: float,
     把信号压缩成 [-max_leverage, +max_leverage] 的目标仓位。
     k 控制信号强度到仓位的映射尺度（后面用样本波动/分位数定标）。
     """
-    x = np.tanh(k * signal)
-    return float(np.clip(x * max_leverage, -max_leverage, max_leverage))
+    return float(_target_position(float(signal), float(max_leverage), float(k)))
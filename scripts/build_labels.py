@@ -3,10 +3,15 @@
 使用中间价 (a1_p + b1_p) / 2 计算
 """
 from __future__ import annotations
+import os
 from pathlib import Path
 import pandas as pd
+from joblib import Parallel, delayed
 
-from src.pipeline_io import load_config, load_universe, iter_daily_files
+from src.pipeline_io import load_config, load_universe
+from src.io_lob_polars import read_raw_csv_pl
+from src.pipeline_io_cache import cached_iter_universe
+from src.utils.time import minute_key
 
 
 def compute_minute_returns(df: pd.DataFrame) -> pd.Series:
@@ -19,50 +24,71 @@ def compute_minute_returns(df: pd.DataFrame) -> pd.Series:
     Returns:
         分钟级未来收益率 Series，index为minute时间
     """
-    # 确保时间列是datetime类型
-    if not isinstance(df['ts'], pd.DatetimeIndex):
-        df['ts'] = pd.to_datetime(df['ts'])
+    # int64 时间戳整除一分钟得到分桶键（不走 dt.floor，也不往 df 里写新列）
+    # NaT 的 int64 视图是极小负数，会成为假的最早一分钟：先剔掉（同 groupby 丢弃 NaT 键）
+    ts = pd.to_datetime(df['ts'])
+    valid = ts.notna().to_numpy()
+    ts = ts[valid]
+    key, per_minute = minute_key(ts.to_numpy())
     
-    # 向下取整到分钟
-    df['minute'] = df['ts'].dt.floor('min') # type: ignore
-    
-    # 计算每分钟最后一笔的中间价
-    close = (df.groupby('minute').last()['a1_p'] + 
-             df.groupby('minute').last()['b1_p']) / 2
+    # 一次 groupby 同时拿到每分钟最后一笔的 a1_p / b1_p
+    last = df.loc[valid, ['a1_p', 'b1_p']].groupby(key).last()
+    mid = (last['a1_p'].to_numpy() + last['b1_p'].to_numpy()) * 0.5
     
     # 计算未来收益率：ret[t] = (close[t+1] - close[t]) / close[t]
-    ret = close.shift(-1) / close - 1
+    minutes = pd.DatetimeIndex((last.index.to_numpy()[:-1] * per_minute).view(ts.dtype), name='minute')
+    ret = pd.Series(mid[1:] / mid[:-1] - 1.0, index=minutes)
     
-    # 去掉最后一个NaN
+    # 去掉NaN
     ret = ret.dropna()
     
     return ret
 
 
 def out_path(base: Path, symbol: str, date: str) -> Path:
-    """生成输出文件路径"""
-    d = base / symbol
-    d.mkdir(parents=True, exist_ok=True)
-    return d / f"{date}.parquet"
+    """生成输出文件路径（目录由调用方按 symbol 统一创建）"""
+    return base / symbol / f"{date}.parquet"
 
 
 def load_daily(path: Path, source: str) -> pd.DataFrame:
     """加载单日数据"""
     if source == "processed":
+        # pyarrow 读 parquet 本身就是多线程列式读取，保持不动
+        return pd.read_parquet(path)
+    if source == "raw" and path.suffix == ".parquet":
+        # raw 的 zstd parquet 孪生文件（scripts/raw_csv_to_parquet.py 生成）
         return pd.read_parquet(path)
     if source == "raw":
-        try:
-            return pd.read_csv(path, compression="gzip")
-        except pd.errors.ParserError:
-            return pd.read_csv(
-                path, 
-                compression="gzip",
-                on_bad_lines='skip',
-                engine='python'
-            )
+        # polars 读 csv.gz，解析不了的值直接报错
+        return read_raw_csv_pl(path).to_pandas()
     raise ValueError(f"unknown source={source}")
 
 
+def _process_one(task: tuple) -> tuple:
+    """处理单个 (symbol, date)：加载 -> 计算 -> 写 parquet，返回 (status, sym, date, src, file, err)"""
+    sym, date, path, src, op = task
+    try:
+        # 加载数据
+        df = load_daily(path, src)
+        
+        # 检查必需列
+        if 'a1_p' not in df.columns or 'b1_p' not in df.columns:
+            raise ValueError(f"Missing a1_p or b1_p columns")
+        
+        # 计算分钟收益率
+        ret = compute_minute_returns(df)
+        
+        # 保存为DataFrame（方便后续处理）
+        ret_df = ret.to_frame(name='ret')
+        # 单列 ~240 行：zstd-3 比默认 snappy 压缩率高，整文件一个 row group
+        ret_df.to_parquet(op, engine='pyarrow', index=True,
+                          compression='zstd', compression_level=3,
+                          row_group_size=len(ret_df) or 1)
+        return 'ok', sym, date, src, path.name, ''
+    except Exception as e:
+        return 'fail', sym, date, src, path.name, f"{type(e).__name__}: {str(e)[:100]}"
+
+
 def main():
     cfg = load_config("configs/data.yaml")
     universe = load_universe(cfg.data.universe_file)
@@ -77,41 +103,35 @@ def main():
     total_skip = 0
     total_fail = 0
     
+    # 先把所有 (symbol, date) 任务摊平，已存在的直接跳过
+    tasks = []
+    files_by_sym = cached_iter_universe(cfg, universe)
     for sym in universe:
-        for sym, date, path, src in iter_daily_files(
-            cfg.data.processed_dir, cfg.data.raw_dir, sym, 
-            cfg.data.start, cfg.data.end
-        ):
-            op = out_path(output_dir, sym, date)
-            
-            # 跳过已存在的文件
-            if op.exists():
+        sym_dir = output_dir / sym
+        sym_dir.mkdir(parents=True, exist_ok=True)
+        # 一次 listdir 代替每个任务一次 exists()
+        existing = set(os.listdir(sym_dir))
+        
+        for sym, date, path, src in files_by_sym[sym]:
+            if f"{date}.parquet" in existing:
                 total_skip += 1
                 continue
-            
-            try:
-                # 加载数据
-                df = load_daily(path, src)
-                
-                # 检查必需列
-                if 'a1_p' not in df.columns or 'b1_p' not in df.columns:
-                    raise ValueError(f"Missing a1_p or b1_p columns")
-                
-                # 计算分钟收益率
-                ret = compute_minute_returns(df)
-                
-                # 保存为DataFrame（方便后续处理）
-                ret_df = ret.to_frame(name='ret')
-                ret_df.to_parquet(op)
-                
-                total_done += 1
-                
-                if total_done % 50 == 0:
-                    print(f"[OK] done={total_done} skip={total_skip} fail={total_fail}")
-                    
-            except Exception as e:
-                total_fail += 1
-                print(f"[FAIL] {sym} {date} src={src} file={path.name} err={type(e).__name__}: {str(e)[:100]}")
+            tasks.append((sym, date, path, src, out_path(output_dir, sym, date)))
+    
+    print(f"Tasks: {len(tasks)}, skip={total_skip}")
+    
+    # 每个 (symbol, date) 互相独立，按进程并行；batch_size 给大一点摊薄调度开销
+    results = Parallel(n_jobs=os.cpu_count(), batch_size=50, return_as="generator")(
+        delayed(_process_one)(t) for t in tasks
+    )
+    for status, sym, date, src, fname, err in results:
+        if status == 'ok':
+            total_done += 1
+            if total_done % 50 == 0:
+                print(f"[OK] done={total_done} skip={total_skip} fail={total_fail}")
+        else:
+            total_fail += 1
+            print(f"[FAIL] {sym} {date} src={src} file={fname} err={err}")
     
     print(f"\nFinished. done={total_done} skip={total_skip} fail={total_fail}")
     print(f"Labels saved to: {output_dir}")
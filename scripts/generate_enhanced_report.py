@@ -6,12 +6,6 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei']
-plt.rcParams['axes.unicode_minus'] = False
 
 
 def generate_enhanced_report():
@@ -24,111 +18,121 @@ def generate_enhanced_report():
     
     report_path = Path("outputs/reports/day3_ofi_signal_enhanced.md")
     
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write("# OFI信号分析报告（增强版）\n\n")
-        f.write("## 1. 信息系数（IC）汇总\n\n")
-        
-        f.write("### 1.1 各标的IC统计\n\n")
-        f.write("| 标的 | IC | IC p值 | RankIC | RankIC p值 | 样本数 |\n")
-        f.write("|------|-------|---------|---------|------------|--------|\n")
-        
-        for _, row in ic_df.iterrows():
-            f.write(f"| {row['symbol']} | {row['ic_mean']:.4f} | {row['ic_pval']:.4e} | "
-                   f"{row['rankic_mean']:.4f} | {row['rankic_pval']:.4e} | {int(row['n_samples']):,} |\n")
-        
-        f.write("\n### 1.2 整体统计\n\n")
-        
-        ic_mean = ic_df['ic_mean'].mean()
-        ic_std = ic_df['ic_mean'].std()
-        ic_tstat = ic_mean / ic_std * np.sqrt(len(ic_df))
-        
-        rankic_mean = ic_df['rankic_mean'].mean()
-        rankic_std = ic_df['rankic_mean'].std()
-        rankic_tstat = rankic_mean / rankic_std * np.sqrt(len(ic_df))
-        
-        f.write(f"- **平均IC**: {ic_mean:.4f} ± {ic_std:.4f}\n")
-        f.write(f"- **IC t统计量**: {ic_tstat:.2f}\n")
-        f.write(f"- **平均RankIC**: {rankic_mean:.4f} ± {rankic_std:.4f}\n")
-        f.write(f"- **RankIC t统计量**: {rankic_tstat:.2f}\n")
-        f.write(f"- **总样本数**: {int(ic_df['n_samples'].sum()):,}\n\n")
-        
-        # 解读
-        f.write("### 1.3 结果解读\n\n")
-        
-        if rankic_mean > 0.05:
-            f.write("✅ **RankIC显著为正**：OFI对下一分钟收益率有较强的预测能力\n\n")
-        elif rankic_mean > 0.02:
-            f.write("✔️ **RankIC为正**：OFI对下一分钟收益率有一定的预测能力\n\n")
-        else:
-            f.write("❌ **RankIC较弱**：OFI的预测能力有限\n\n")
-        
-        if abs(rankic_tstat) > 2:
-            f.write(f"✅ **统计显著性强**：t统计量 = {rankic_tstat:.2f}，远超显著性阈值(±2)\n\n")
-        else:
-            f.write(f"❌ **统计显著性弱**：t统计量 = {rankic_tstat:.2f}，未达到显著性阈值(±2)\n\n")
-        
-        # IC vs RankIC
-        f.write("### 1.4 IC vs RankIC对比\n\n")
-        f.write(f"- IC: {ic_mean:.4f} (Pearson相关系数，衡量线性关系)\n")
-        f.write(f"- RankIC: {rankic_mean:.4f} (Spearman相关系数，衡量单调关系)\n\n")
-        
-        if rankic_mean > ic_mean:
-            f.write("**RankIC > IC**：表明OFI与收益率更多是单调关系而非线性关系，建议使用排序类策略\n\n")
-        else:
-            f.write("**IC >= RankIC**：表明OFI与收益率的线性关系较强\n\n")
-        
-        # 分组收益图表
-        f.write("## 2. 分位数组收益率\n\n")
-        f.write("按OFI大小将样本分为5组，观察各组的平均收益率：\n\n")
-        
-        for symbol in ic_df['symbol']:
-            f.write(f"### {symbol}\n\n")
-            f.write(f"![{symbol}分组收益](day3_ofi_quantile_{symbol}.png)\n\n")
-        
-        # 使用建议
-        f.write("## 3. 策略建议\n\n")
-        
-        f.write("基于以上分析，对OFI因子的使用建议如下：\n\n")
-        
-        if rankic_mean > 0.05 and abs(rankic_tstat) > 2:
-            f.write("### ✅ 推荐使用\n\n")
-            f.write("1. **因子有效性**：RankIC显著为正，预测能力强\n")
-            f.write("2. **策略类型**：建议使用分组策略或排序策略\n")
-            f.write("3. **持仓周期**：1分钟（基于当前分析）\n")
-            f.write("4. **风险提示**：\n")
-            f.write("   - 注意交易成本（高频交易）\n")
-            f.write("   - 监控滑点影响\n")
-            f.write("   - 考虑组合构建以降低个股风险\n\n")
-        elif rankic_mean > 0.02:
-            f.write("### ⚠️ 谨慎使用\n\n")
-            f.write("1. **因子有效性**：RankIC为正但不够强\n")
-            f.write("2. **改进方向**：\n")
-            f.write("   - 考虑与其他因子组合\n")
-            f.write("   - 尝试不同的OFI计算方法（如不同深度）\n")
-            f.write("   - 调整持仓周期\n")
-            f.write("3. **风险提示**：单独使用可能效果不佳\n\n")
-        else:
-            f.write("### ❌ 不推荐使用\n\n")
-            f.write("1. **因子有效性**：预测能力不足\n")
-            f.write("2. **改进方向**：\n")
-            f.write("   - 重新审视OFI计算逻辑\n")
-            f.write("   - 考虑数据质量问题\n")
-            f.write("   - 尝试其他订单流特征\n\n")
-        
-        # 下一步工作
-        f.write("## 4. 后续分析方向\n\n")
-        f.write("1. **分层分析**：\n")
-        f.write("   - 按市场状态分层（高波动/低波动）\n")
-        f.write("   - 按时段分层（开盘/收盘/午间）\n\n")
-        f.write("2. **衰减分析**：\n")
-        f.write("   - 观察OFI对未来1/3/5/10分钟收益的预测能力衰减\n\n")
-        f.write("3. **组合优化**：\n")
-        f.write("   - 与其他因子（成交量、波动率）组合\n")
-        f.write("   - 构建多因子模型\n\n")
-        f.write("4. **回测验证**：\n")
-        f.write("   - 完整的回测框架\n")
-        f.write("   - 考虑交易成本、滑点\n")
-        f.write("   - 计算夏普比率、最大回撤等指标\n\n")
+    # 整份报告先拼在内存里，最后一次写盘
+    buf = []
+    buf.append("# OFI信号分析报告（增强版）\n\n")
+    buf.append("## 1. 信息系数（IC）汇总\n\n")
+    
+    buf.append("### 1.1 各标的IC统计\n\n")
+    buf.append("| 标的 | IC | IC p值 | RankIC | RankIC p值 | 样本数 |\n")
+    buf.append("|------|-------|---------|---------|------------|--------|\n")
+    
+    buf.extend(
+        f"| {s} | {im:.4f} | {ip:.4e} | {rm:.4f} | {rp:.4e} | {int(n):,} |\n"
+        for s, im, ip, rm, rp, n in zip(ic_df['symbol'], ic_df['ic_mean'], ic_df['ic_pval'],
+                                        ic_df['rankic_mean'], ic_df['rankic_pval'], ic_df['n_samples'])
+    )
+    
+    buf.append("\n### 1.2 整体统计\n\n")
+    
+    # 一次 agg 拿到所有整体统计量
+    agg = ic_df.agg({'ic_mean': ['mean', 'std'], 'rankic_mean': ['mean', 'std'], 'n_samples': 'sum'})
+    sqrt_n = np.sqrt(len(ic_df))
+    
+    ic_mean = agg.loc['mean', 'ic_mean']
+    ic_std = agg.loc['std', 'ic_mean']
+    ic_tstat = ic_mean / ic_std * sqrt_n
+    
+    rankic_mean = agg.loc['mean', 'rankic_mean']
+    rankic_std = agg.loc['std', 'rankic_mean']
+    rankic_tstat = rankic_mean / rankic_std * sqrt_n
+    n_samples = agg.loc['sum', 'n_samples']
+    
+    buf.append(f"- **平均IC**: {ic_mean:.4f} ± {ic_std:.4f}\n")
+    buf.append(f"- **IC t统计量**: {ic_tstat:.2f}\n")
+    buf.append(f"- **平均RankIC**: {rankic_mean:.4f} ± {rankic_std:.4f}\n")
+    buf.append(f"- **RankIC t统计量**: {rankic_tstat:.2f}\n")
+    buf.append(f"- **总样本数**: {int(n_samples):,}\n\n")
+    
+    # 解读
+    buf.append("### 1.3 结果解读\n\n")
+    
+    if rankic_mean > 0.05:
+        buf.append("✅ **RankIC显著为正**：OFI对下一分钟收益率有较强的预测能力\n\n")
+    elif rankic_mean > 0.02:
+        buf.append("✔️ **RankIC为正**：OFI对下一分钟收益率有一定的预测能力\n\n")
+    else:
+        buf.append("❌ **RankIC较弱**：OFI的预测能力有限\n\n")
+    
+    if abs(rankic_tstat) > 2:
+        buf.append(f"✅ **统计显著性强**：t统计量 = {rankic_tstat:.2f}，远超显著性阈值(±2)\n\n")
+    else:
+        buf.append(f"❌ **统计显著性弱**：t统计量 = {rankic_tstat:.2f}，未达到显著性阈值(±2)\n\n")
+    
+    # IC vs RankIC
+    buf.append("### 1.4 IC vs RankIC对比\n\n")
+    buf.append(f"- IC: {ic_mean:.4f} (Pearson相关系数，衡量线性关系)\n")
+    buf.append(f"- RankIC: {rankic_mean:.4f} (Spearman相关系数，衡量单调关系)\n\n")
+    
+    if rankic_mean > ic_mean:
+        buf.append("**RankIC > IC**：表明OFI与收益率更多是单调关系而非线性关系，建议使用排序类策略\n\n")
+    else:
+        buf.append("**IC >= RankIC**：表明OFI与收益率的线性关系较强\n\n")
+    
+    # 分组收益图表
+    buf.append("## 2. 分位数组收益率\n\n")
+    buf.append("按OFI大小将样本分为5组，观察各组的平均收益率：\n\n")
+    
+    for symbol in ic_df['symbol']:
+        buf.append(f"### {symbol}\n\n")
+        buf.append(f"![{symbol}分组收益](day3_ofi_quantile_{symbol}.png)\n\n")
+    
+    # 使用建议
+    buf.append("## 3. 策略建议\n\n")
+    
+    buf.append("基于以上分析，对OFI因子的使用建议如下：\n\n")
+    
+    if rankic_mean > 0.05 and abs(rankic_tstat) > 2:
+        buf.append("### ✅ 推荐使用\n\n")
+        buf.append("1. **因子有效性**：RankIC显著为正，预测能力强\n")
+        buf.append("2. **策略类型**：建议使用分组策略或排序策略\n")
+        buf.append("3. **持仓周期**：1分钟（基于当前分析）\n")
+        buf.append("4. **风险提示**：\n")
+        buf.append("   - 注意交易成本（高频交易）\n")
+        buf.append("   - 监控滑点影响\n")
+        buf.append("   - 考虑组合构建以降低个股风险\n\n")
+    elif rankic_mean > 0.02:
+        buf.append("### ⚠️ 谨慎使用\n\n")
+        buf.append("1. **因子有效性**：RankIC为正但不够强\n")
+        buf.append("2. **改进方向**：\n")
+        buf.append("   - 考虑与其他因子组合\n")
+        buf.append("   - 尝试不同的OFI计算方法（如不同深度）\n")
+        buf.append("   - 调整持仓周期\n")
+        buf.append("3. **风险提示**：单独使用可能效果不佳\n\n")
+    else:
+        buf.append("### ❌ 不推荐使用\n\n")
+        buf.append("1. **因子有效性**：预测能力不足\n")
+        buf.append("2. **改进方向**：\n")
+        buf.append("   - 重新审视OFI计算逻辑\n")
+        buf.append("   - 考虑数据质量问题\n")
+        buf.append("   - 尝试其他订单流特征\n\n")
+    
+    # 下一步工作
+    buf.append("## 4. 后续分析方向\n\n")
+    buf.append("1. **分层分析**：\n")
+    buf.append("   - 按市场状态分层（高波动/低波动）\n")
+    buf.append("   - 按时段分层（开盘/收盘/午间）\n\n")
+    buf.append("2. **衰减分析**：\n")
+    buf.append("   - 观察OFI对未来1/3/5/10分钟收益的预测能力衰减\n\n")
+    buf.append("3. **组合优化**：\n")
+    buf.append("   - 与其他因子（成交量、波动率）组合\n")
+    buf.append("   - 构建多因子模型\n\n")
+    buf.append("4. **回测验证**：\n")
+    buf.append("   - 完整的回测框架\n")
+    buf.append("   - 考虑交易成本、滑点\n")
+    buf.append("   - 计算夏普比率、最大回撤等指标\n\n")
+    
+    report_path.write_text("".join(buf), encoding='utf-8')
     
     print(f"Enhanced report saved to {report_path}")
     
@@ -138,6 +142,13 @@ def generate_enhanced_report():
 
 def generate_summary_charts(ic_df: pd.DataFrame):
     """生成汇总图表"""
+    import matplotlib
+    matplotlib.use('Agg')  # 只出图到文件，不初始化 GUI 后端
+    import matplotlib.pyplot as plt
+    
+    # 设置中文字体
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
     
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     
@@ -170,10 +181,11 @@ def generate_summary_charts(ic_df: pd.DataFrame):
     
     # 3. IC vs RankIC散点图
     ax = axes[1, 0]
-    ax.scatter(ic_df['ic_mean'], ic_df['rankic_mean'], s=100, alpha=0.6)
-    for i, symbol in enumerate(ic_df['symbol']):
-        ax.annotate(symbol, (ic_df.iloc[i]['ic_mean'], ic_df.iloc[i]['rankic_mean']),
-                   fontsize=8, alpha=0.7)
+    xs = ic_df['ic_mean'].to_numpy()
+    ys = ic_df['rankic_mean'].to_numpy()
+    ax.scatter(xs, ys, s=100, alpha=0.6, rasterized=True)
+    for symbol, x_, y_ in zip(ic_df['symbol'].to_numpy(), xs, ys):
+        ax.annotate(symbol, (x_, y_), fontsize=8, alpha=0.7)
     ax.set_xlabel('IC')
     ax.set_ylabel('RankIC')
     ax.set_title('IC vs RankIC')
@@ -197,7 +209,7 @@ def generate_summary_charts(ic_df: pd.DataFrame):
     
     plt.tight_layout()
     output_path = Path("outputs/reports/day3_ofi_ic_summary.png")
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.savefig(output_path, dpi=150, bbox_inches='tight', pil_kwargs={'optimize': True})
     plt.close()
     
     print(f"Summary chart saved to {output_path}")
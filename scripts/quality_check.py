@@ -8,80 +8,63 @@ from __future__ import annotations
 from pathlib import Path
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import polars as pl
 from typing import List, Dict
 
-from src.pipeline_io import load_config, load_universe, iter_daily_files
+from src.io_lob_polars import read_raw_csv_pl
 
 
-def load_daily(path: Path, source: str) -> pd.DataFrame:
-    """加载单日数据"""
-    if source == "processed":
-        return pd.read_parquet(path)
-    if source == "raw":
-        try:
-            return pd.read_csv(path, compression="gzip")
-        except pd.errors.ParserError:
-            return pd.read_csv(
-                path, 
-                compression="gzip",
-                on_bad_lines='skip',
-                engine='python'
-            )
-    raise ValueError(f"unknown source={source}")
+EXPECTED_MINUTES = 240  # A股连续竞价约240分钟
 
 
-def check_minute_coverage(df: pd.DataFrame) -> Dict:
-    """检查分钟覆盖率"""
-    if 'ts' not in df.columns:
-        return {'n_minutes': 0, 'expected': 240, 'coverage': 0.0}
+def _qc_polars(path: Path, source: str) -> Dict:
+    """单次列式扫描：同时算分钟覆盖率和book异常率"""
+    if source == "processed" or path.suffix == ".parquet":
+        # raw 的 zstd parquet 孪生文件也直接 lazy 扫
+        lf = pl.scan_parquet(path)
+    elif source == "raw":
+        # scan_csv 不支持 gzip，只能先读进来再走 lazy；脏值直接报错，由调用方记为 QC 失败
+        lf = read_raw_csv_pl(path).lazy()
+    else:
+        raise ValueError(f"unknown source={source}")
     
-    df['ts'] = pd.to_datetime(df['ts'])
-    df['minute'] = df['ts'].dt.floor('min') # type: ignore
-    n_minutes = df['minute'].nunique()
-    expected = 240  # A股连续竞价约240分钟
-    coverage = n_minutes / expected
+    schema = lf.collect_schema()
+    exprs = [pl.len().alias('total_rows')]
     
-    return {
-        'n_minutes': n_minutes,
-        'expected': expected,
-        'coverage': coverage
-    }
-
-
-def check_book_anomalies(df: pd.DataFrame) -> Dict:
-    """检查订单簿异常"""
-    total = len(df)
-    if total == 0:
-        return {
-            'spread_negative': 0.0,
-            'mid_negative': 0.0,
-            'bid_ge_ask': 0.0,
-            'total_rows': 0
-        }
+    # 分钟覆盖率
+    if 'ts' in schema:
+        ts = pl.col('ts')
+        if schema['ts'] == pl.String:
+            ts = ts.str.to_datetime()
+        exprs.append(ts.dt.truncate('1m').drop_nulls().n_unique().alias('n_minutes'))
     
-    anomalies = {}
+    # book异常：spread <= 0 / mid <= 0 / bid >= ask
+    has_book = 'a1_p' in schema and 'b1_p' in schema
+    if has_book:
+        a, b = pl.col('a1_p'), pl.col('b1_p')
+        exprs += [
+            ((a - b) <= 0).sum().alias('spread_negative'),
+            ((a + b) <= 0).sum().alias('mid_negative'),
+            (b >= a).sum().alias('bid_ge_ask'),
+        ]
     
-    # 检查spread <= 0
-    if 'a1_p' in df.columns and 'b1_p' in df.columns:
-        spread = df['a1_p'] - df['b1_p']
-        anomalies['spread_negative'] = (spread <= 0).sum() / total
-        
-        # 检查mid <= 0
-        mid = (df['a1_p'] + df['b1_p']) / 2
-        anomalies['mid_negative'] = (mid <= 0).sum() / total
-        
-        # 检查bid >= ask
-        anomalies['bid_ge_ask'] = (df['b1_p'] >= df['a1_p']).sum() / total
-    else:
-        anomalies['spread_negative'] = np.nan
-        anomalies['mid_negative'] = np.nan
-        anomalies['bid_ge_ask'] = np.nan
+    row = lf.select(exprs).collect().row(0, named=True)
+    total = row['total_rows']
+    n_minutes = row.get('n_minutes', 0)
     
-    anomalies['total_rows'] = total
+    result = {
+        'n_minutes': n_minutes,
+        'expected': EXPECTED_MINUTES,
+        'coverage': n_minutes / EXPECTED_MINUTES,
+    }
+    for col in ['spread_negative', 'mid_negative', 'bid_ge_ask']:
+        if not has_book:
+            result[col] = np.nan
+        else:
+            result[col] = row[col] / total if total else 0.0
+    result['total_rows'] = total
     
-    return anomalies
+    return result
 
 
 def load_ofi_data(ofi_dir: Path, symbol: str, date: str) -> pd.DataFrame:
@@ -123,6 +106,10 @@ def check_ofi_distribution(ofi_df: pd.DataFrame) -> Dict:
 
 
 def main():
+    # 运行期依赖放到 main 里，import 本模块时不拉起 pipeline 和 matplotlib
+    from src.pipeline_io import load_config, load_universe
+    from src.pipeline_io_cache import cached_iter_universe
+
     cfg = load_config("configs/data.yaml")
     universe = load_universe(cfg.data.universe_file)
     
@@ -134,30 +121,32 @@ def main():
     
     # 收集所有统计信息
     results = []
-    ofi_stats_by_symbol = {sym: [] for sym in universe}
+    # OFI时序统计按列存（SoA），每个标的预分配到文件数上限，用写游标填
+    ofi_soa = {}
     
     total_files = 0
     processed = 0
+    files_by_sym = cached_iter_universe(cfg, universe)
     
     for sym in universe:
         print(f"\nProcessing {sym}...")
         sym_count = 0
         
-        for sym, date, path, src in iter_daily_files(
-            cfg.data.processed_dir, cfg.data.raw_dir, sym, 
-            cfg.data.start, cfg.data.end
-        ):
+        files = files_by_sym[sym]
+        k = len(files)
+        soa = ofi_soa[sym] = {
+            'n': 0,
+            'date': np.empty(k, dtype='int64'),
+            'mean': np.empty(k),
+            'std': np.empty(k),
+        }
+        
+        for sym, date, path, src in files:
             total_files += 1
             
             try:
-                # 加载tick数据
-                df = load_daily(path, src)
-                
-                # 检查分钟覆盖率
-                coverage = check_minute_coverage(df)
-                
-                # 检查book异常
-                anomalies = check_book_anomalies(df)
+                # 分钟覆盖率 + book异常（一次扫描）
+                qc = _qc_polars(path, src)
                 
                 # 加载OFI数据
                 ofi_df = load_ofi_data(cfg.ofi.output_dir, sym, date)
@@ -168,25 +157,25 @@ def main():
                     'symbol': sym,
                     'date': date,
                     'source': src,
-                    **coverage,
-                    **anomalies,
+                    **qc,
                     'ofi_mean': ofi_dist['mean'],
                     'ofi_std': ofi_dist['std'],
                     'ofi_q25': ofi_dist['q25'],
                     'ofi_q50': ofi_dist['q50'],
                     'ofi_q75': ofi_dist['q75'],
                     'ofi_min': ofi_dist['min'],
-                    'ofi_max': ofi_dist['max']
+                    'ofi_max': ofi_dist['max'],
+                    'qc_error': '',
                 }
                 results.append(result)
                 
                 # 收集OFI统计用于可视化
                 if not np.isnan(ofi_dist['mean']):
-                    ofi_stats_by_symbol[sym].append({
-                        'date': pd.to_datetime(date),
-                        'mean': ofi_dist['mean'],
-                        'std': ofi_dist['std']
-                    })
+                    i = soa['n']
+                    soa['date'][i] = np.datetime64(date, 'D').astype('int64')
+                    soa['mean'][i] = ofi_dist['mean']
+                    soa['std'][i] = ofi_dist['std']
+                    soa['n'] = i + 1
                 
                 processed += 1
                 sym_count += 1
@@ -195,7 +184,10 @@ def main():
                     print(f"  Processed {processed}/{total_files} files...")
                     
             except Exception as e:
-                print(f"  [ERROR] {sym} {date}: {str(e)[:80]}")
+                # 读不了 / 解析失败本身就是质量问题：记一行失败，不从报告里消失
+                err = f"{type(e).__name__}: {str(e)[:80]}"
+                print(f"  [ERROR] {sym} {date}: {err}")
+                results.append({'symbol': sym, 'date': date, 'source': src, 'qc_error': err})
                 continue
         
         print(f"  {sym}: {sym_count} days processed")
@@ -208,29 +200,49 @@ def main():
     df_results.to_csv(csv_path, index=False)
     print(f"\nSaved summary to: {csv_path}")
     
+    # 同一个 groupby 复用：报告表一次 agg 算完，控制台照旧打印 describe()（含分位数）
+    gb = df_results.groupby('symbol')
+    summary = gb.agg({
+        'coverage': ['mean', 'min', 'max', 'count'],
+        'ofi_mean': ['mean', 'std'],
+        'ofi_std': ['mean', 'std'],
+    })
+    anomaly_cols = [c for c in ['spread_negative', 'mid_negative', 'bid_ge_ask'] if c in df_results.columns]
+    anomaly_means = df_results[anomaly_cols].mean()
+    
     # 生成统计报告
     print("\n=== Data Quality Summary ===")
     print(f"\nMinute Coverage:")
-    print(df_results.groupby('symbol')['coverage'].describe())
+    print(gb['coverage'].describe())
     
     print(f"\nBook Anomalies (mean %):")
-    for col in ['spread_negative', 'mid_negative', 'bid_ge_ask']:
-        if col in df_results.columns:
-            print(f"  {col}: {df_results[col].mean()*100:.4f}%")
+    for col in anomaly_cols:
+        print(f"  {col}: {anomaly_means[col]*100:.4f}%")
     
     # 可视化OFI分布
     print("\nGenerating OFI distribution plot...")
     
+    import matplotlib
+    matplotlib.use('Agg')  # 只出图到文件，不初始化 GUI 后端
+    import matplotlib.pyplot as plt
+    # OFI 时序线点数多，允许简化路径顶点
+    plt.rcParams['path.simplify'] = True
+    plt.rcParams['path.simplify_threshold'] = 1.0
+    
     fig, axes = plt.subplots(len(universe), 2, figsize=(14, 4*len(universe)))
     if len(universe) == 1:
         axes = axes.reshape(1, -1)
     
     for idx, sym in enumerate(universe):
-        stats = ofi_stats_by_symbol[sym]
-        if not stats:
+        soa = ofi_soa[sym]
+        n = soa['n']
+        if n == 0:
             continue
         
-        stats_df = pd.DataFrame(stats).set_index('date').sort_index()
+        stats_df = pd.DataFrame(
+            {'mean': soa['mean'][:n], 'std': soa['std'][:n]},
+            index=pd.DatetimeIndex(soa['date'][:n].view('datetime64[D]')),
+        ).sort_index()
         
         # 左图：均值时序
         axes[idx, 0].plot(stats_df.index, stats_df['mean'], linewidth=0.8)
@@ -247,7 +259,7 @@ def main():
     
     plt.tight_layout()
     png_path = output_dir / "day3_ofi_distribution.png"
-    plt.savefig(png_path, dpi=150, bbox_inches='tight')
+    plt.savefig(png_path, dpi=150, bbox_inches='tight', pil_kwargs={'optimize': True})
     print(f"Saved plot to: {png_path}")
     
     # 生成Markdown报告
@@ -263,24 +275,23 @@ def main():
         f.write(f"- 标的列表: {', '.join(universe)}\n\n")
         
         f.write("## 2. 分钟覆盖率\n\n")
-        cov_summary = df_results.groupby('symbol')['coverage'].agg(['mean', 'min', 'max', 'count'])
+        cov_summary = summary['coverage'][['mean', 'min', 'max', 'count']]
         f.write(cov_summary.to_markdown())
         f.write("\n\n")
         
         f.write("## 3. Book异常率 (平均%)\n\n")
         f.write("| 异常类型 | 比例 |\n")
         f.write("|---------|------|\n")
-        for col in ['spread_negative', 'mid_negative', 'bid_ge_ask']:
-            if col in df_results.columns:
-                ratio = df_results[col].mean() * 100
-                f.write(f"| {col} | {ratio:.4f}% |\n")
+        for col in anomaly_cols:
+            ratio = anomaly_means[col] * 100
+            f.write(f"| {col} | {ratio:.4f}% |\n")
         f.write("\n")
         
         f.write("## 4. OFI分布稳定性\n\n")
         f.write("![OFI Distribution](day3_ofi_distribution.png)\n\n")
         
         f.write("### 按标的统计\n\n")
-        ofi_summary = df_results.groupby('symbol')[['ofi_mean', 'ofi_std']].agg(['mean', 'std'])
+        ofi_summary = summary[['ofi_mean', 'ofi_std']]
         f.write(ofi_summary.to_markdown())
         f.write("\n\n")
         
@@ -300,7 +311,11 @@ def main():
         if len(ofi_mean_outliers) > 0:
             f.write(f"⚠️ **警告**: {len(ofi_mean_outliers)} 个文件的OFI均值异常（超过5倍标准差）\n\n")
         
-        if len(low_coverage) == 0 and len(high_anomaly) == 0 and len(ofi_mean_outliers) == 0:
+        failed = df_results[df_results['qc_error'] != '']
+        if len(failed) > 0:
+            f.write(f"⚠️ **警告**: {len(failed)} 个文件读取/解析失败（见 day3_panel_summary.csv 的 qc_error 列）\n\n")
+        
+        if len(low_coverage) == 0 and len(high_anomaly) == 0 and len(ofi_mean_outliers) == 0 and len(failed) == 0:
             f.write("✅ 数据质量良好，未发现明显异常。\n\n")
     
     print(f"Saved markdown report to: {md_path}")
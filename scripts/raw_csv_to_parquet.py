@@ -0,0 +1,63 @@
+"""
+一次性把 raw tick 的 gzip csv 转成同目录的 zstd parquet 孪生文件
+2021-01-04.csv.gz -> 2021-01-04.parquet（内容为 read_raw_lob_csv 的解析结果）
+之后 convert_one_day / iter_daily_files 会优先读 parquet，不再重复解压、解析字符串
+"""
+from __future__ import annotations
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from src.io_lob import raw_parquet_twin, read_raw_lob_csv, twin_is_fresh
+
+
+def convert_one(raw_file: Path) -> Path:
+    """单个 csv.gz -> parquet 孪生文件"""
+    symbol = raw_file.parent.name
+    date_str = raw_file.name.split(".")[0]
+    if date_str == "part":  # symbol/date/part.csv.gz 格式
+        symbol, date_str = raw_file.parent.parent.name, raw_file.parent.name
+    df = read_raw_lob_csv(raw_file, default_symbol=symbol, default_date=date_str)
+
+    out = raw_parquet_twin(raw_file)
+    df.to_parquet(out, engine="pyarrow", index=False,
+                  compression="zstd", compression_level=3,
+                  use_dictionary=["code", "date"])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--raw_root", type=str, default="data/raw/ticks")
+    ap.add_argument("--overwrite", action="store_true")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    args = ap.parse_args()
+
+    files = sorted(Path(args.raw_root).rglob("*.csv.gz"))
+    # 孪生文件缺失或比 csv 旧（csv 重新下载过）都要重转
+    tasks = [f for f in files if args.overwrite or not twin_is_fresh(f, raw_parquet_twin(f))]
+    skipped = len(files) - len(tasks)
+    print(f"Tasks: {len(tasks)}, skipped={skipped}")
+
+    total = 0
+    failed = 0
+    # 每个文件独立，按文件多进程
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        futures = {ex.submit(convert_one, f): f for f in tasks}
+        for fut in as_completed(futures):
+            f = futures[fut]
+            try:
+                fut.result()
+                total += 1
+                if total % 200 == 0:
+                    print(f"[OK {total}] (skipped={skipped}, failed={failed}) last={f}")
+            except Exception as e:
+                failed += 1
+                print(f"[FAIL] {f} -> {e}")
+
+    print(f"Done. OK={total}, skipped={skipped}, failed={failed}")
+
+
+if __name__ == "__main__":
+    main()
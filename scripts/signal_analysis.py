@@ -3,60 +3,75 @@ OFI信号分析：IC、RankIC、分组收益
 评估OFI因子对未来收益率的预测能力
 """
 from __future__ import annotations
+import argparse
+import bisect
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy import stats
 from typing import Dict, List, Tuple
 
 from src.pipeline_io import load_config, load_universe
+from src.ofi_core import mlofi_arr
+from src.stats.ic_numba import ic_and_rankic, ic_and_rankic_batch, corr_pvalue
+from src.stats.quantile import qcut_codes, group_stats
+from src.utils.time import minute_segments
+
+
+# OFI/收益只用到 ts 和五档价量，读 parquet 时只取这些列
+TICK_COLS = ['ts'] + [f'{s}{i}_{k}' for s in 'ab' for i in range(1, 6) for k in 'pv']
+
+
+def read_tick_columns(tick_path: Path) -> pd.DataFrame:
+    """按列投影读取tick parquet（文件里没有的档位列自动跳过）"""
+    names = set(pq.read_schema(tick_path).names)
+    return pd.read_parquet(tick_path, columns=[c for c in TICK_COLS if c in names], engine='pyarrow')
 
 
 def compute_ofi_from_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
     """从tick数据计算OFI"""
-    if not isinstance(df['ts'], pd.DatetimeIndex):
+    # df['ts'] 是 Series 不是 Index，按列 dtype 判断，已是时间类型就不再解析
+    if not pd.api.types.is_datetime64_any_dtype(df['ts']):
         df['ts'] = pd.to_datetime(df['ts'])
     
-    df['minute'] = df['ts'].dt.floor('min')
-    
-    # 计算tick级OFI
-    ofi_sum = 0
-    for i in range(1, levels + 1):
-        a_col_p, a_col_v = f'a{i}_p', f'a{i}_v'
-        b_col_p, b_col_v = f'b{i}_p', f'b{i}_v'
-        
-        if all(c in df.columns for c in [a_col_p, a_col_v, b_col_p, b_col_v]):
-            # 计算价格和量的变化
-            delta_bid_v = df[b_col_v].diff()
-            delta_ask_v = df[a_col_v].diff()
-            
-            # OFI = delta_bid_v (价格不变或上升) - delta_ask_v (价格不变或下降)
-            ofi_level = delta_bid_v - delta_ask_v
-            ofi_sum += ofi_level
+    # tick 已按时间排序，按分钟切段即可，不必哈希分组
+    starts, _, minutes = minute_segments(df['ts'].to_numpy())
     
-    df['ofi_tick'] = ofi_sum
+    # 计算tick级OFI：各档价量取成 (n_ticks, levels) 连续数组，交给 numba 内核按价格分支计算
+    present = [i for i in range(1, levels + 1)
+               if all(c in df.columns for c in (f'a{i}_p', f'a{i}_v', f'b{i}_p', f'b{i}_v'))]
+    ofi_tick = np.zeros(len(df))
+    if present and len(df):
+        def _mat(side, kind):
+            cols = [f'{side}{i}_{kind}' for i in present]
+            return np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64))
+        ofi_tick = mlofi_arr(_mat('b', 'p'), _mat('b', 'v'), _mat('a', 'p'), _mat('a', 'v'))[:, -1]
     
-    # 聚合到分钟
-    ofi_minute = df.groupby('minute')['ofi_tick'].sum()
+    # 聚合到分钟（NaN 按 0 计，同 groupby.sum）
+    ofi_minute = pd.Series(np.add.reduceat(np.nan_to_num(ofi_tick), starts),
+                           index=pd.Index(minutes, name='minute'), name='ofi_tick')
     
     return ofi_minute
 
 
 def compute_minute_returns(df: pd.DataFrame) -> pd.Series:
     """计算分钟收益率"""
-    if not isinstance(df['ts'], pd.DatetimeIndex):
+    # df['ts'] 是 Series 不是 Index，按列 dtype 判断，已是时间类型就不再解析
+    if not pd.api.types.is_datetime64_any_dtype(df['ts']):
         df['ts'] = pd.to_datetime(df['ts'])
     
-    df['minute'] = df['ts'].dt.floor('min')
+    _, lasts, minutes = minute_segments(df['ts'].to_numpy())
     
-    # 每分钟最后一笔的中间价
-    close = (df.groupby('minute').last()['a1_p'] + 
-             df.groupby('minute').last()['b1_p']) / 2
+    # 每分钟最后一笔的中间价（每列只取一次）
+    close = (df['a1_p'].to_numpy()[lasts] + df['b1_p'].to_numpy()[lasts]) / 2
     
-    # 未来收益率
-    ret = close.shift(-1) / close - 1
+    # 未来收益率：最后一分钟没有下一分钟，直接不出值，省掉 shift 再 dropna
+    ret = pd.Series(close[1:] / close[:-1] - 1, index=pd.Index(minutes[:-1], name='minute'))
     
     return ret.dropna()
 
@@ -73,7 +88,7 @@ def load_ofi_and_labels(ofi_dir: Path, label_dir: Path, symbol: str, date: str,
     
     try:
         # 加载tick数据
-        df = pd.read_parquet(tick_path)
+        df = read_tick_columns(tick_path)
         
         # 计算OFI
         ofi = compute_ofi_from_tick(df, levels=5)
@@ -102,18 +117,16 @@ def calculate_ic(ofi: pd.Series, ret: pd.Series) -> Dict:
     if len(ofi) < 10:  # 至少需要10个观测
         return {'ic': np.nan, 'rank_ic': np.nan, 'n_obs': len(ofi)}
     
-    # Pearson相关系数
-    ic, p_value = stats.pearsonr(ofi, ret)
-    
-    # Spearman相关系数（更稳健）
-    rank_ic, rank_p_value = stats.spearmanr(ofi, ret)
+    # Pearson 和 Spearman（更稳健）在同一个 numba 内核里算
+    ic, rank_ic, n = ic_and_rankic(np.ascontiguousarray(ofi, dtype=np.float64),
+                                   np.ascontiguousarray(ret, dtype=np.float64))
     
     return {
         'ic': ic,
         'rank_ic': rank_ic,
-        'n_obs': len(ofi),
-        'ic_p_value': p_value,
-        'rank_ic_p_value': rank_p_value
+        'n_obs': n,
+        'ic_p_value': corr_pvalue(ic, n),
+        'rank_ic_p_value': corr_pvalue(rank_ic, n)
     }
 
 
@@ -132,30 +145,29 @@ def calculate_quantile_returns(ofi: pd.Series, ret: pd.Series, n_groups: int = 5
     if len(ofi) < n_groups * 2:
         return None
     
-    # 创建DataFrame
-    df = pd.DataFrame({'ofi': ofi, 'ret': ret})
+    ofi_arr = np.asarray(ofi, dtype=np.float64)
+    ret_arr = np.asarray(ret, dtype=np.float64)
     
-    # 按OFI分组（qcut会自动处理相同值）
-    try:
-        df['group'] = pd.qcut(df['ofi'], q=n_groups, labels=False, duplicates='drop')
-    except ValueError:
-        # 如果qcut失败（比如唯一值太少），用普通分组
-        df['group'] = pd.cut(df['ofi'], bins=n_groups, labels=False)
+    # 按OFI分位数分组（相同分位点自动合并，与 qcut duplicates='drop' 一致）
+    codes = qcut_codes(ofi_arr, n_groups)
+    if codes is None:
+        # 唯一值太少分不出组，用普通等宽分组
+        codes = pd.cut(ofi_arr, bins=n_groups, labels=False)
     
     # 计算各组平均收益
-    group_stats = df.groupby('group')['ret'].agg(['mean', 'std', 'count'])
+    groups, means, stds, counts = group_stats(codes, ret_arr)
     
     # 计算多空收益（最高组 - 最低组）
-    long_short = group_stats.loc[group_stats.index.max(), 'mean'] - group_stats.loc[group_stats.index.min(), 'mean']
+    long_short = means[-1] - means[0]
     
     # 检查单调性
-    returns = group_stats['mean'].values
-    is_monotonic = all(returns[i] <= returns[i+1] for i in range(len(returns)-1)) or \
-                   all(returns[i] >= returns[i+1] for i in range(len(returns)-1))
+    steps = np.diff(means)
+    is_monotonic = bool((steps <= 0).all() or (steps >= 0).all())
     
     return {
-        'group_returns': group_stats['mean'].to_dict(),
-        'group_counts': group_stats['count'].to_dict(),
+        'group_returns': dict(zip(groups.tolist(), means.tolist())),
+        'group_stds': dict(zip(groups.tolist(), stds.tolist())),
+        'group_counts': dict(zip(groups.tolist(), counts.tolist())),
         'long_short': long_short,
         'is_monotonic': is_monotonic
     }
@@ -171,21 +183,41 @@ def analyze_symbol(symbol: str, ofi_dir: Path, label_dir: Path, start: str, end:
     if not symbol_ofi_dir.exists():
         return pd.DataFrame()
     
-    for file_path in sorted(symbol_ofi_dir.glob("*.parquet")):
-        date = file_path.stem
-        
-        # 过滤日期范围
-        if date < start or date > end:
-            continue
-        
+    # 先把有效日期全部加载，IC 在所有日期上一次批量算
+    days = []
+    # 文件名即 YYYY-MM-DD，排序后用二分截出 [start, end] 区间
+    stems = sorted(p.stem for p in symbol_ofi_dir.glob("*.parquet"))
+    lo = bisect.bisect_left(stems, start)
+    hi = bisect.bisect_right(stems, end)
+    for date in stems[lo:hi]:
         # 加载数据
         df = load_ofi_and_labels(ofi_dir, label_dir, symbol, date)
         
         if df is None or len(df) < 10:
             continue
         
-        # 计算IC
-        ic_stats = calculate_ic(df['ofi'], df['ret'])
+        days.append((date, df))
+    
+    if not days:
+        return pd.DataFrame()
+    
+    # 各日首尾相接成一列，offsets 标出每天的区间
+    offsets = np.zeros(len(days) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(df) for _, df in days])
+    x = np.concatenate([df['ofi'].to_numpy(dtype=np.float64) for _, df in days])
+    y = np.concatenate([df['ret'].to_numpy(dtype=np.float64) for _, df in days])
+    ic, rank_ic, n_obs = ic_and_rankic_batch(x, y, offsets)
+    ic_p = corr_pvalue(ic, n_obs)
+    rank_p = corr_pvalue(rank_ic, n_obs)
+    
+    for d, (date, df) in enumerate(days):
+        ic_stats = {
+            'ic': ic[d],
+            'rank_ic': rank_ic[d],
+            'n_obs': int(n_obs[d]),
+            'ic_p_value': ic_p[d],
+            'rank_ic_p_value': rank_p[d]
+        }
         
         # 计算分组收益
         quantile_stats = calculate_quantile_returns(df['ofi'], df['ret'], n_groups=5)
@@ -209,7 +241,7 @@ def analyze_symbol(symbol: str, ofi_dir: Path, label_dir: Path, start: str, end:
     return pd.DataFrame(results)
 
 
-def generate_report(all_results: pd.DataFrame, output_dir: Path):
+def generate_report(all_results: pd.DataFrame, output_dir: Path, plots: bool = True):
     """生成分析报告"""
     
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -223,10 +255,11 @@ def generate_report(all_results: pd.DataFrame, output_dir: Path):
         'n_obs': 'mean'
     })
     
+    # 按标的分组只做一次，后面各节（t统计量、图、报告）都复用
+    symbol_groups = {s: g for s, g in all_results.groupby('symbol', sort=False)}
+    
     # 计算t统计量
-    for symbol in all_results['symbol'].unique():
-        sym_data = all_results[all_results['symbol'] == symbol]
-        
+    for symbol, sym_data in symbol_groups.items():
         # IC的t-stat
         ic_values = sym_data['ic'].dropna()
         if len(ic_values) > 1:
@@ -246,26 +279,27 @@ def generate_report(all_results: pd.DataFrame, output_dir: Path):
     all_results.to_csv(csv_path, index=False)
     print(f"\nSaved detailed results to: {csv_path}")
     
-    # 3. 生成可视化
-    generate_visualizations(all_results, ic_summary, output_dir)
+    # 3. 生成可视化（--no-plots 时跳过）
+    if plots:
+        generate_visualizations(all_results, ic_summary, output_dir, symbol_groups)
     
     # 4. 生成Markdown报告
-    generate_markdown_report(all_results, ic_summary, output_dir)
+    generate_markdown_report(all_results, ic_summary, output_dir, symbol_groups)
 
 
-def generate_visualizations(all_results: pd.DataFrame, ic_summary: pd.DataFrame, output_dir: Path):
+def generate_visualizations(all_results: pd.DataFrame, ic_summary: pd.DataFrame, output_dir: Path,
+                            symbol_groups: Dict[str, pd.DataFrame]):
     """生成可视化图表"""
     
-    symbols = all_results['symbol'].unique()
-    n_symbols = len(symbols)
+    n_symbols = len(symbol_groups)
     
     # 图1：IC时序图
     fig, axes = plt.subplots(n_symbols, 1, figsize=(12, 3*n_symbols))
     if n_symbols == 1:
         axes = [axes]
     
-    for idx, symbol in enumerate(symbols):
-        sym_data = all_results[all_results['symbol'] == symbol].copy()
+    for idx, (symbol, sym_data) in enumerate(symbol_groups.items()):
+        sym_data = sym_data.copy()
         sym_data['date'] = pd.to_datetime(sym_data['date'])
         sym_data = sym_data.sort_values('date')
         
@@ -286,9 +320,7 @@ def generate_visualizations(all_results: pd.DataFrame, ic_summary: pd.DataFrame,
     fig, axes = plt.subplots(2, 3, figsize=(15, 10))
     axes = axes.flatten()
     
-    for idx, symbol in enumerate(symbols):
-        sym_data = all_results[all_results['symbol'] == symbol]
-        
+    for idx, (symbol, sym_data) in enumerate(symbol_groups.items()):
         # 提取分组收益列
         group_cols = [col for col in sym_data.columns if col.startswith('g') and col.endswith('_ret')]
         
@@ -315,9 +347,7 @@ def generate_visualizations(all_results: pd.DataFrame, ic_summary: pd.DataFrame,
     fig, axes = plt.subplots(2, 3, figsize=(15, 10))
     axes = axes.flatten()
     
-    for idx, symbol in enumerate(symbols):
-        sym_data = all_results[all_results['symbol'] == symbol]
-        
+    for idx, (symbol, sym_data) in enumerate(symbol_groups.items()):
         axes[idx].hist(sym_data['ic'].dropna(), bins=30, alpha=0.6, label='IC', edgecolor='black')
         axes[idx].hist(sym_data['rank_ic'].dropna(), bins=30, alpha=0.6, label='RankIC', edgecolor='black')
         axes[idx].axvline(0, color='red', linestyle='--', linewidth=1)
@@ -333,144 +363,148 @@ def generate_visualizations(all_results: pd.DataFrame, ic_summary: pd.DataFrame,
     print(f"Saved IC distribution plot")
 
 
-def generate_markdown_report(all_results: pd.DataFrame, ic_summary: pd.DataFrame, output_dir: Path):
+def generate_markdown_report(all_results: pd.DataFrame, ic_summary: pd.DataFrame, output_dir: Path,
+                             symbol_groups: Dict[str, pd.DataFrame]):
     """生成Markdown报告"""
     
     md_path = output_dir / "day3_ofi_signal.md"
     
-    with open(md_path, 'w', encoding='utf-8') as f:
-        f.write("# Day3 OFI信号分析报告\n\n")
-        f.write(f"生成时间: {pd.Timestamp.now()}\n\n")
-        
-        f.write("## 1. 概述\n\n")
-        f.write("本报告评估OFI（订单流失衡）因子对未来1分钟收益率的预测能力。\n\n")
-        f.write("**分析方法：**\n")
-        f.write("- IC (Information Coefficient): Pearson相关系数\n")
-        f.write("- RankIC: Spearman相关系数（更稳健）\n")
-        f.write("- 分组分析: 将OFI分为5组，观察各组未来收益\n\n")
-        
-        f.write("## 2. IC/RankIC汇总\n\n")
-        f.write("### 按标的统计\n\n")
-        
-        # 格式化IC汇总表
-        summary_table = ic_summary.copy()
-        summary_table.columns = ['_'.join(col).strip() for col in summary_table.columns.values]
-        f.write(summary_table.to_markdown())
-        f.write("\n\n")
-        
-        # 解读
-        f.write("### 解读\n\n")
-        for symbol in all_results['symbol'].unique():
-            sym_data = all_results[all_results['symbol'] == symbol]
-            ic_mean = sym_data['ic'].mean()
-            rank_ic_mean = sym_data['rank_ic'].mean()
-            
-            # 计算t统计量
-            ic_tstat = ic_mean / (sym_data['ic'].std() / np.sqrt(len(sym_data)))
-            
-            f.write(f"**{symbol}:**\n")
-            f.write(f"- IC均值: {ic_mean:.6f} (t-stat: {ic_tstat:.2f})\n")
-            f.write(f"- RankIC均值: {rank_ic_mean:.6f}\n")
-            
-            # 判断显著性
-            if abs(ic_tstat) > 2.0:
-                f.write(f"- ✅ IC显著 (|t-stat| > 2.0)\n")
-            else:
-                f.write(f"- ⚠️ IC不显著 (|t-stat| < 2.0)\n")
-            
-            # 判断方向
-            if ic_mean > 0:
-                f.write(f"- 方向: 正向（OFI越大，未来收益越高）\n")
-            else:
-                f.write(f"- 方向: 负向（OFI越大，未来收益越低）\n")
-            
-            f.write("\n")
-        
-        f.write("## 3. 分组收益分析\n\n")
-        f.write("### 平均分组收益\n\n")
-        f.write("将OFI分为5组（Q0最小，Q4最大），观察各组的平均未来收益：\n\n")
-        
-        # 分组收益表
-        group_summary = []
-        for symbol in all_results['symbol'].unique():
-            sym_data = all_results[all_results['symbol'] == symbol]
-            
-            row = {'symbol': symbol}
-            for i in range(5):
-                col = f'g{i}_ret'
-                if col in sym_data.columns:
-                    row[f'Q{i}'] = sym_data[col].mean()
-            
-            if 'long_short' in sym_data.columns:
-                row['Long-Short'] = sym_data['long_short'].mean()
-            
-            if 'is_monotonic' in sym_data.columns:
-                monotonic_ratio = sym_data['is_monotonic'].mean()
-                row['Monotonic%'] = monotonic_ratio
-            
-            group_summary.append(row)
-        
-        group_df = pd.DataFrame(group_summary)
-        f.write(group_df.to_markdown(index=False))
-        f.write("\n\n")
-        
-        f.write("**说明：**\n")
-        f.write("- Q0: OFI最小组\n")
-        f.write("- Q4: OFI最大组\n")
-        f.write("- Long-Short: Q4 - Q0 (多空收益)\n")
-        f.write("- Monotonic%: 分组收益单调的天数占比\n\n")
-        
-        f.write("## 4. 可视化\n\n")
-        f.write("### IC时序图\n\n")
-        f.write("![IC Time Series](day3_ic_timeseries.png)\n\n")
-        
-        f.write("### 分组收益图\n\n")
-        f.write("![Group Returns](day3_group_returns.png)\n\n")
-        
-        f.write("### IC分布图\n\n")
-        f.write("![IC Distribution](day3_ic_distribution.png)\n\n")
-        
-        f.write("## 5. 结论\n\n")
-        
-        # 统计显著的标的
-        significant_symbols = []
-        for symbol in all_results['symbol'].unique():
-            sym_data = all_results[all_results['symbol'] == symbol]
-            ic_tstat = sym_data['ic'].mean() / (sym_data['ic'].std() / np.sqrt(len(sym_data)))
-            if abs(ic_tstat) > 2.0:
-                significant_symbols.append(symbol)
-        
-        if significant_symbols:
-            f.write(f"✅ **发现显著信号**: {len(significant_symbols)}/{len(all_results['symbol'].unique())} 个标的的OFI因子显著\n\n")
-            f.write(f"显著标的: {', '.join(significant_symbols)}\n\n")
+    # 整份报告先拼进 parts，最后一次写盘
+    parts = []
+    parts.append("# Day3 OFI信号分析报告\n\n")
+    parts.append(f"生成时间: {pd.Timestamp.now()}\n\n")
+    
+    parts.append("## 1. 概述\n\n")
+    parts.append("本报告评估OFI（订单流失衡）因子对未来1分钟收益率的预测能力。\n\n")
+    parts.append("**分析方法：**\n")
+    parts.append("- IC (Information Coefficient): Pearson相关系数\n")
+    parts.append("- RankIC: Spearman相关系数（更稳健）\n")
+    parts.append("- 分组分析: 将OFI分为5组，观察各组未来收益\n\n")
+    
+    parts.append("## 2. IC/RankIC汇总\n\n")
+    parts.append("### 按标的统计\n\n")
+    
+    # 格式化IC汇总表
+    summary_table = ic_summary.copy()
+    summary_table.columns = ['_'.join(col).strip() for col in summary_table.columns.values]
+    parts.append(summary_table.to_markdown())
+    parts.append("\n\n")
+    
+    # 解读
+    parts.append("### 解读\n\n")
+    for symbol, sym_data in symbol_groups.items():
+        ic_mean = sym_data['ic'].mean()
+        rank_ic_mean = sym_data['rank_ic'].mean()
+        
+        # 计算t统计量
+        ic_tstat = ic_mean / (sym_data['ic'].std() / np.sqrt(len(sym_data)))
+        
+        parts.append(f"**{symbol}:**\n")
+        parts.append(f"- IC均值: {ic_mean:.6f} (t-stat: {ic_tstat:.2f})\n")
+        parts.append(f"- RankIC均值: {rank_ic_mean:.6f}\n")
+        
+        # 判断显著性
+        if abs(ic_tstat) > 2.0:
+            parts.append(f"- ✅ IC显著 (|t-stat| > 2.0)\n")
         else:
-            f.write("⚠️ **未发现显著信号**: 所有标的的IC t统计量绝对值均 < 2.0\n\n")
-        
-        # 计算整体IC
-        overall_ic = all_results['ic'].mean()
-        overall_rank_ic = all_results['rank_ic'].mean()
+            parts.append(f"- ⚠️ IC不显著 (|t-stat| < 2.0)\n")
         
-        f.write(f"**整体IC**: {overall_ic:.6f}\n\n")
-        f.write(f"**整体RankIC**: {overall_rank_ic:.6f}\n\n")
-        
-        f.write("### 建议\n\n")
-        if overall_ic > 0.01 and len(significant_symbols) >= len(all_results['symbol'].unique()) / 2:
-            f.write("- OFI因子显示出较强的预测能力，可以考虑构建策略\n")
-            f.write("- 建议重点关注IC显著的标的\n")
-            f.write("- 需要进一步考虑交易成本和滑点\n")
-        elif overall_ic > 0:
-            f.write("- OFI因子显示出微弱的预测能力\n")
-            f.write("- 建议结合其他因子或优化OFI计算方法\n")
-            f.write("- 需要考虑是否能覆盖交易成本\n")
+        # 判断方向
+        if ic_mean > 0:
+            parts.append(f"- 方向: 正向（OFI越大，未来收益越高）\n")
         else:
-            f.write("- OFI因子预测能力较弱或方向相反\n")
-            f.write("- 建议重新审视OFI的计算方法或参数\n")
-            f.write("- 可能需要考虑反向交易或寻找其他因子\n")
+            parts.append(f"- 方向: 负向（OFI越大，未来收益越低）\n")
+        
+        parts.append("\n")
+    
+    parts.append("## 3. 分组收益分析\n\n")
+    parts.append("### 平均分组收益\n\n")
+    parts.append("将OFI分为5组（Q0最小，Q4最大），观察各组的平均未来收益：\n\n")
+    
+    # 分组收益表
+    group_summary = []
+    for symbol, sym_data in symbol_groups.items():
+        row = {'symbol': symbol}
+        for i in range(5):
+            col = f'g{i}_ret'
+            if col in sym_data.columns:
+                row[f'Q{i}'] = sym_data[col].mean()
+        
+        if 'long_short' in sym_data.columns:
+            row['Long-Short'] = sym_data['long_short'].mean()
+        
+        if 'is_monotonic' in sym_data.columns:
+            monotonic_ratio = sym_data['is_monotonic'].mean()
+            row['Monotonic%'] = monotonic_ratio
+        
+        group_summary.append(row)
+    
+    group_df = pd.DataFrame(group_summary)
+    parts.append(group_df.to_markdown(index=False))
+    parts.append("\n\n")
+    
+    parts.append("**说明：**\n")
+    parts.append("- Q0: OFI最小组\n")
+    parts.append("- Q4: OFI最大组\n")
+    parts.append("- Long-Short: Q4 - Q0 (多空收益)\n")
+    parts.append("- Monotonic%: 分组收益单调的天数占比\n\n")
+    
+    parts.append("## 4. 可视化\n\n")
+    parts.append("### IC时序图\n\n")
+    parts.append("![IC Time Series](day3_ic_timeseries.png)\n\n")
+    
+    parts.append("### 分组收益图\n\n")
+    parts.append("![Group Returns](day3_group_returns.png)\n\n")
+    
+    parts.append("### IC分布图\n\n")
+    parts.append("![IC Distribution](day3_ic_distribution.png)\n\n")
+    
+    parts.append("## 5. 结论\n\n")
+    
+    # 统计显著的标的
+    significant_symbols = []
+    for symbol, sym_data in symbol_groups.items():
+        ic_tstat = sym_data['ic'].mean() / (sym_data['ic'].std() / np.sqrt(len(sym_data)))
+        if abs(ic_tstat) > 2.0:
+            significant_symbols.append(symbol)
+    
+    if significant_symbols:
+        parts.append(f"✅ **发现显著信号**: {len(significant_symbols)}/{len(symbol_groups)} 个标的的OFI因子显著\n\n")
+        parts.append(f"显著标的: {', '.join(significant_symbols)}\n\n")
+    else:
+        parts.append("⚠️ **未发现显著信号**: 所有标的的IC t统计量绝对值均 < 2.0\n\n")
+    
+    # 计算整体IC
+    overall_ic = all_results['ic'].mean()
+    overall_rank_ic = all_results['rank_ic'].mean()
+    
+    parts.append(f"**整体IC**: {overall_ic:.6f}\n\n")
+    parts.append(f"**整体RankIC**: {overall_rank_ic:.6f}\n\n")
+    
+    parts.append("### 建议\n\n")
+    if overall_ic > 0.01 and len(significant_symbols) >= len(symbol_groups) / 2:
+        parts.append("- OFI因子显示出较强的预测能力，可以考虑构建策略\n")
+        parts.append("- 建议重点关注IC显著的标的\n")
+        parts.append("- 需要进一步考虑交易成本和滑点\n")
+    elif overall_ic > 0:
+        parts.append("- OFI因子显示出微弱的预测能力\n")
+        parts.append("- 建议结合其他因子或优化OFI计算方法\n")
+        parts.append("- 需要考虑是否能覆盖交易成本\n")
+    else:
+        parts.append("- OFI因子预测能力较弱或方向相反\n")
+        parts.append("- 建议重新审视OFI的计算方法或参数\n")
+        parts.append("- 可能需要考虑反向交易或寻找其他因子\n")
+    
+    md_path.write_text(''.join(parts), encoding='utf-8')
     
     print(f"\nSaved markdown report to: {md_path}")
 
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--no-plots", action="store_true", help="只出报告，不画图")
+    args = ap.parse_args()
+    
     cfg = load_config("configs/data.yaml")
     universe = load_universe(cfg.data.universe_file)
     
@@ -482,15 +516,19 @@ def main():
     # 分析所有标的
     all_results = []
     
-    for symbol in universe:
-        print(f"\nAnalyzing {symbol}...")
-        result_df = analyze_symbol(symbol, ofi_dir, label_dir, cfg.data.start, cfg.data.end)
-        
-        if len(result_df) > 0:
-            all_results.append(result_df)
-            print(f"  {len(result_df)} days analyzed")
-        else:
-            print(f"  No valid data")
+    # 各标的互不依赖，按标的多进程并行；ex.map 保持 universe 顺序
+    run_one = partial(analyze_symbol, ofi_dir=ofi_dir, label_dir=label_dir,
+                      start=cfg.data.start, end=cfg.data.end)
+    n_workers = max(1, min(len(universe), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=n_workers) as ex:
+        for symbol, result_df in zip(universe, ex.map(run_one, universe)):
+            print(f"\nAnalyzing {symbol}...")
+            
+            if len(result_df) > 0:
+                all_results.append(result_df)
+                print(f"  {len(result_df)} days analyzed")
+            else:
+                print(f"  No valid data")
     
     if not all_results:
         print("No results to analyze!")
@@ -503,7 +541,7 @@ def main():
     
     # 生成报告
     output_dir = Path("outputs/reports")
-    generate_report(all_results_df, output_dir)
+    generate_report(all_results_df, output_dir, plots=not args.no_plots)
     
     print("\n✅ Signal analysis completed!")
 
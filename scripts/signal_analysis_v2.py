@@ -3,15 +3,27 @@ OFI信号分析脚本 - 从tick数据直接计算
 计算IC、RankIC、分组收益率
 """
 
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as pads
 from pathlib import Path
-from scipy import stats
 import matplotlib.pyplot as plt
 import seaborn as sns
 import yaml
 from typing import Dict, List
 
+from src.ofi_core import mlofi_arr
+from src.stats.ic_numba import ic_and_rankic, corr_pvalue
+from src.stats.quantile import qcut_codes, group_stats
+from src.stats.running import RunningMoments
+from src.utils.time import minute_segments
+
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
@@ -39,39 +51,40 @@ def load_universe() -> List[str]:
     return content
 
 
+# OFI/收益只用到 ts 和五档价量，读 parquet 时只取这些列
+TICK_COLS = ['ts'] + [f'{s}{i}_{k}' for s in 'ab' for i in range(1, 6) for k in 'pv']
+
+
 def compute_ofi_from_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
     """从tick数据计算分钟级OFI"""
-    if not isinstance(df.index, pd.DatetimeIndex):
-        if 'ts' in df.columns:
+    # 直接用 ts 的 datetime64 数组切分钟，不再 set_index 建 DatetimeIndex
+    if isinstance(df.index, pd.DatetimeIndex):
+        ts = df.index.to_numpy()
+    else:
+        # 已是时间类型的列不再解析
+        if not pd.api.types.is_datetime64_any_dtype(df['ts']):
             df['ts'] = pd.to_datetime(df['ts'])
-            df = df.set_index('ts')
-    
-    # 分钟标签
-    df['minute'] = df.index.floor('min')
+        ts = df['ts'].to_numpy()
     
-    # 计算tick级OFI
-    ofi_sum = 0
-    for i in range(1, levels + 1):
-        a_col_p, a_col_v = f'a{i}_p', f'a{i}_v'
-        b_col_p, b_col_v = f'b{i}_p', f'b{i}_v'
-        
-        if all(c in df.columns for c in [a_col_p, a_col_v, b_col_p, b_col_v]):
-            # 计算量的变化
-            delta_bid_v = df[b_col_v].diff()
-            delta_ask_v = df[a_col_v].diff()
-            
-            # OFI = delta_bid_v - delta_ask_v
-            ofi_level = delta_bid_v - delta_ask_v
-            ofi_sum += ofi_level
+    # 分钟切段（tick 已按时间排序，不必哈希分组）
+    starts, lasts, minutes = minute_segments(ts)
     
-    df['ofi_tick'] = ofi_sum
+    # 计算tick级OFI：各档价量取成 (n_ticks, levels) 连续数组，交给 numba 内核按价格分支计算
+    present = [i for i in range(1, levels + 1)
+               if all(c in df.columns for c in (f'a{i}_p', f'a{i}_v', f'b{i}_p', f'b{i}_v'))]
+    ofi_tick = np.zeros(len(df))
+    if present and len(df):
+        def _mat(side, kind):
+            cols = [f'{side}{i}_{kind}' for i in present]
+            return np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64))
+        ofi_tick = mlofi_arr(_mat('b', 'p'), _mat('b', 'v'), _mat('a', 'p'), _mat('a', 'v'))[:, -1]
     
-    # 聚合到分钟
-    ofi_minute = df.groupby('minute').agg({
-        'ofi_tick': 'sum',
-        'a1_p': 'last',
-        'b1_p': 'last'
-    })
+    # 聚合到分钟：OFI 段内求和（NaN 按 0 计），价格取每分钟最后一笔
+    ofi_minute = pd.DataFrame({
+        'ofi_tick': np.add.reduceat(np.nan_to_num(ofi_tick), starts),
+        'a1_p': df['a1_p'].to_numpy()[lasts],
+        'b1_p': df['b1_p'].to_numpy()[lasts]
+    }, index=pd.Index(minutes, name='minute'))
     
     return ofi_minute
 
@@ -79,25 +92,45 @@ def compute_ofi_from_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
 def compute_minute_returns(ofi_df: pd.DataFrame) -> pd.Series:
     """从OFI DataFrame计算分钟收益率"""
     # 中间价
-    close = (ofi_df['a1_p'] + ofi_df['b1_p']) / 2
+    close = (ofi_df['a1_p'].to_numpy() + ofi_df['b1_p'].to_numpy()) / 2
     
-    # 未来收益率
-    ret = close.shift(-1) / close - 1
+    # 未来收益率：错位切片代替 shift(-1)，最后一分钟为 NaN
+    ret = np.full(len(close), np.nan)
+    ret[:-1] = close[1:] / close[:-1] - 1
     
-    return ret
+    return pd.Series(ret, index=ofi_df.index)
 
 
-def load_and_compute(symbol: str, date: str, processed_dir: Path) -> pd.DataFrame:
-    """加载tick数据并计算OFI和收益率"""
-    tick_path = processed_dir / symbol / date / "part.parquet"
-    
-    if not tick_path.exists():
-        return None
-    
+def iter_symbol_days(symbol_dir: Path):
+    """
+    用 pyarrow dataset 扫描 <symbol>/<date>/part.parquet：一次发现全部文件、统一列投影，
+    按日期分片逐个读出 (date, DataFrame)，内存里只放一天的tick
+    读不了的文件在建 dataset 时排除；各天量列 int/double 混用，统一 cast 成 float64
+    """
+    ds = pads.dataset(symbol_dir, format='parquet', exclude_invalid_files=True,
+                      partitioning=pads.partitioning(pa.schema([('day', pa.string())])))
+    frags = [f for f in ds.get_fragments() if f.path.endswith('/part.parquet')]
+    if not frags:
+        return
+    # 列投影和目标 schema 以首个日期文件为准（ds.schema 可能来自目录下的杂散 parquet）
+    first = frags[0].physical_schema
+    cols = [c for c in TICK_COLS if c in first.names]
+    schema = pa.schema([
+        pa.field(c, pa.float64()) if c.endswith('_v') else first.field(c) for c in cols
+    ])
+    for frag in sorted(frags, key=lambda f: f.path):
+        day = pads.get_partition_keys(frag.partition_expression).get('day')
+        try:
+            table = frag.to_table(columns=cols, schema=schema)
+        except Exception as e:
+            print(f"  Error: {str(e)[:80]}")
+            continue
+        yield day, table.to_pandas()
+
+
+def compute_day(df: pd.DataFrame) -> pd.DataFrame:
+    """单日tick计算OFI和收益率"""
     try:
-        # 加载tick数据
-        df = pd.read_parquet(tick_path)
-        
         # 计算OFI
         ofi_df = compute_ofi_from_tick(df, levels=5)
         
@@ -120,18 +153,16 @@ def calculate_ic(df: pd.DataFrame) -> Dict:
     if len(df) < 10:
         return None
     
-    # Pearson相关系数 (IC)
-    ic, ic_pval = stats.pearsonr(df['ofi'], df['ret'])
-    
-    # Spearman相关系数 (RankIC)
-    rankic, rankic_pval = stats.spearmanr(df['ofi'], df['ret'])
+    # Pearson (IC) 和 Spearman (RankIC) 在同一个 numba 内核里算
+    ic, rankic, n = ic_and_rankic(np.ascontiguousarray(df['ofi'], dtype=np.float64),
+                                  np.ascontiguousarray(df['ret'], dtype=np.float64))
     
     return {
         'ic_mean': ic,
-        'ic_pval': ic_pval,
+        'ic_pval': corr_pvalue(ic, n),
         'rankic_mean': rankic,
-        'rankic_pval': rankic_pval,
-        'n_samples': len(df)
+        'rankic_pval': corr_pvalue(rankic, n),
+        'n_samples': n
     }
 
 
@@ -140,39 +171,37 @@ def calculate_quantile_returns(df: pd.DataFrame, n_quantiles: int = 5) -> Dict:
     if len(df) < n_quantiles * 2:
         return None
     
-    try:
-        # 根据OFI分组
-        df = df.copy()
-        df['group'] = pd.qcut(df['ofi'], q=n_quantiles, labels=False, duplicates='drop')
-    except ValueError:
-        # qcut失败，用cut
-        df['group'] = pd.cut(df['ofi'], bins=n_quantiles, labels=False)
+    ofi = df['ofi'].to_numpy(dtype=np.float64)
+    ret = df['ret'].to_numpy(dtype=np.float64)
+    
+    # 根据OFI分组
+    codes = qcut_codes(ofi, n_quantiles)
+    if codes is None:
+        # 分位点全重复，用cut
+        codes = pd.cut(ofi, bins=n_quantiles, labels=False)
     
     # 各组统计
-    group_stats = df.groupby('group')['ret'].agg(['mean', 'std', 'count'])
+    groups, means, stds, counts = group_stats(codes, ret)
     
     # 多空收益
-    if len(group_stats) >= 2:
-        long_short = group_stats.loc[group_stats.index.max(), 'mean'] - \
-                     group_stats.loc[group_stats.index.min(), 'mean']
-    else:
-        long_short = np.nan
+    long_short = means[-1] - means[0] if len(groups) >= 2 else np.nan
     
     return {
-        'group_returns': group_stats['mean'].to_dict(),
-        'group_counts': group_stats['count'].to_dict(),
+        'group_returns': dict(zip(groups.tolist(), means.tolist())),
+        'group_stds': dict(zip(groups.tolist(), stds.tolist())),
+        'group_counts': dict(zip(groups.tolist(), counts.tolist())),
         'long_short': long_short
     }
 
 
-def generate_visualizations(symbol: str, quantile_returns: Dict, output_dir: Path):
-    """生成分组收益图表"""
+def generate_visualizations(symbol: str, quantile_returns: Dict, output_dir: Path, ax):
+    """生成分组收益图表（ax 由调用方创建，各标的复用同一张图）"""
     if quantile_returns is None:
         return
     
     group_returns = quantile_returns['group_returns']
     
-    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.cla()
     
     groups = sorted(group_returns.keys())
     returns = [group_returns[g] for g in groups]
@@ -183,10 +212,10 @@ def generate_visualizations(symbol: str, quantile_returns: Dict, output_dir: Pat
     ax.set_title(f'{symbol} - OFI Quantile Group Returns')
     ax.grid(True, alpha=0.3)
     
-    plt.tight_layout()
+    fig = ax.figure
+    fig.tight_layout()
     output_path = output_dir / f"day3_ofi_quantile_{symbol}.png"
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
     
     print(f"  Chart saved to {output_path}")
 
@@ -195,30 +224,99 @@ def generate_report(summary_df: pd.DataFrame, output_dir: Path):
     """生成Markdown报告"""
     report_path = output_dir / "day3_ofi_signal.md"
     
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write("# OFI Signal Analysis Report\n\n")
-        f.write("## IC Summary\n\n")
-        
-        f.write("| Symbol | IC | IC p-value | RankIC | RankIC p-value | Samples |\n")
-        f.write("|--------|-------|------------|--------|----------------|----------|\n")
-        
-        for _, row in summary_df.iterrows():
-            f.write(f"| {row['symbol']} | {row['ic_mean']:.4f} | {row['ic_pval']:.4f} | "
-                   f"{row['rankic_mean']:.4f} | {row['rankic_pval']:.4f} | {int(row['n_samples'])} |\n")
-        
-        f.write("\n## Overall Statistics\n\n")
-        f.write(f"- Mean IC: {summary_df['ic_mean'].mean():.4f}\n")
-        f.write(f"- Mean RankIC: {summary_df['rankic_mean'].mean():.4f}\n")
-        f.write(f"- IC t-stat: {summary_df['ic_mean'].mean() / summary_df['ic_mean'].std() * np.sqrt(len(summary_df)):.2f}\n")
-        f.write(f"- RankIC t-stat: {summary_df['rankic_mean'].mean() / summary_df['rankic_mean'].std() * np.sqrt(len(summary_df)):.2f}\n")
-        
-        f.write("\n## Quantile Group Visualizations\n\n")
-        f.write("See individual symbol charts in this directory.\n")
+    # 整份报告先拼进 parts，最后一次写盘
+    parts = []
+    parts.append("# OFI Signal Analysis Report\n\n")
+    parts.append("## IC Summary\n\n")
+    
+    parts.append("| Symbol | IC | IC p-value | RankIC | RankIC p-value | Samples |\n")
+    parts.append("|--------|-------|------------|--------|----------------|----------|\n")
+    
+    for _, row in summary_df.iterrows():
+        parts.append(f"| {row['symbol']} | {row['ic_mean']:.4f} | {row['ic_pval']:.4f} | "
+                     f"{row['rankic_mean']:.4f} | {row['rankic_pval']:.4f} | {int(row['n_samples'])} |\n")
+    
+    parts.append("\n## Overall Statistics\n\n")
+    parts.append(f"- Mean IC: {summary_df['ic_mean'].mean():.4f}\n")
+    parts.append(f"- Mean RankIC: {summary_df['rankic_mean'].mean():.4f}\n")
+    parts.append(f"- IC t-stat: {summary_df['ic_mean'].mean() / summary_df['ic_mean'].std() * np.sqrt(len(summary_df)):.2f}\n")
+    parts.append(f"- RankIC t-stat: {summary_df['rankic_mean'].mean() / summary_df['rankic_mean'].std() * np.sqrt(len(summary_df)):.2f}\n")
+    
+    parts.append("\n## Quantile Group Visualizations\n\n")
+    parts.append("See individual symbol charts in this directory.\n")
+    
+    report_path.write_text(''.join(parts), encoding='utf-8')
     
     print(f"\nReport saved to {report_path}")
 
 
+def analyze_symbol(symbol: str, processed_dir: Path) -> Dict:
+    """单个标的：逐日算OFI、收益率和日IC，合并后算全样本IC和分组收益（在子进程里跑，不画图）"""
+    # 遍历日期目录
+    symbol_dir = processed_dir / symbol
+    if not symbol_dir.exists():
+        return {'symbol': symbol, 'status': 'no_dir'}
+    
+    # 收集该标的的所有数据（OFI/收益仍逐日计算，不跨日差分）
+    symbol_data = []
+    # 逐日 IC 随算随记：明细行写长表，日 IC 的均值/标准差用 Welford 单遍累计
+    daily_rows = []
+    ic_daily, rankic_daily = RunningMoments(), RunningMoments()
+    for date, df in iter_symbol_days(symbol_dir):
+        merged = compute_day(df)
+        
+        if merged is not None and len(merged) > 0:
+            symbol_data.append(merged)
+            
+            day_ic = calculate_ic(merged)
+            if day_ic:
+                ic_daily.update(day_ic['ic_mean'])
+                rankic_daily.update(day_ic['rankic_mean'])
+                day_q = calculate_quantile_returns(merged, n_quantiles=5)
+                daily_rows.append({
+                    'symbol': symbol,
+                    'date': date,
+                    'ic': day_ic['ic_mean'],
+                    'ic_pval': day_ic['ic_pval'],
+                    'rankic': day_ic['rankic_mean'],
+                    'rankic_pval': day_ic['rankic_pval'],
+                    'n_samples': day_ic['n_samples'],
+                    'long_short': day_q['long_short'] if day_q else np.nan,
+                })
+    
+    if not symbol_data:
+        return {'symbol': symbol, 'status': 'no_data'}
+    
+    # 合并所有日期（分钟级 ofi/ret 两列，全样本 RankIC 和分位数需要整段数据）
+    all_data = pd.concat(symbol_data, ignore_index=True)
+    
+    # 计算IC
+    ic_results = calculate_ic(all_data)
+    if ic_results:
+        ic_results['symbol'] = symbol
+        ic_results.update({
+            'n_days': ic_daily.n,
+            'ic_daily_mean': ic_daily.mean if ic_daily.n else np.nan,
+            'ic_daily_std': ic_daily.std,
+            'rankic_daily_mean': rankic_daily.mean if rankic_daily.n else np.nan,
+            'rankic_daily_std': rankic_daily.std,
+        })
+    
+    return {
+        'symbol': symbol,
+        'status': 'ok',
+        'n_records': len(all_data),
+        'ic': ic_results,
+        'quantile': calculate_quantile_returns(all_data, n_quantiles=5),
+        'daily': daily_rows,
+    }
+
+
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--no-plots", action="store_true", help="只出报告，不画图")
+    args = ap.parse_args()
+    
     # 加载配置
     config = load_config()
     processed_dir = config['processed_dir']
@@ -232,50 +330,44 @@ def main():
     print(f"Computing OFI from tick data...\n")
     
     all_results = []
+    daily_rows = []
     
-    for symbol in universe:
-        print(f"Processing {symbol}...")
-        
-        # 收集该标的的所有数据
-        symbol_data = []
-        
-        # 遍历日期目录
-        symbol_dir = processed_dir / symbol
-        if not symbol_dir.exists():
-            print(f"  No data directory")
-            continue
-        
-        for date_dir in sorted(symbol_dir.iterdir()):
-            if date_dir.is_dir():
-                date = date_dir.name
-                merged = load_and_compute(symbol, date, processed_dir)
-                
-                if merged is not None and len(merged) > 0:
-                    symbol_data.append(merged)
-        
-        if not symbol_data:
-            print(f"  No valid data\n")
-            continue
-        
-        # 合并所有日期
-        all_data = pd.concat(symbol_data, ignore_index=True)
-        print(f"  Total records: {len(all_data)}")
-        
-        # 计算IC
-        ic_results = calculate_ic(all_data)
-        if ic_results:
-            ic_results['symbol'] = symbol
-            all_results.append(ic_results)
-            print(f"  IC: {ic_results['ic_mean']:.4f}, RankIC: {ic_results['rankic_mean']:.4f}")
-        
-        # 计算分组收益
-        quantile_returns = calculate_quantile_returns(all_data, n_quantiles=5)
-        if quantile_returns:
-            print(f"  Long-Short: {quantile_returns['long_short']:.6f}")
-        
-        # 生成图表
-        generate_visualizations(symbol, quantile_returns, output_dir)
-        print()
+    # 各标的共用一张图，每次 cla 后重画，省掉反复建/销毁 figure
+    fig, ax = (None, None) if args.no_plots else plt.subplots(figsize=(10, 6))
+    
+    # 各标的互不依赖，多进程并行计算；画图留在主进程按 universe 顺序做
+    n_workers = max(1, min(len(universe), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=n_workers) as ex:
+        for res in ex.map(partial(analyze_symbol, processed_dir=processed_dir), universe):
+            symbol = res['symbol']
+            print(f"Processing {symbol}...")
+            
+            if res['status'] == 'no_dir':
+                print(f"  No data directory")
+                continue
+            if res['status'] == 'no_data':
+                print(f"  No valid data\n")
+                continue
+            
+            print(f"  Total records: {res['n_records']}")
+            daily_rows.extend(res['daily'])
+            
+            ic_results = res['ic']
+            if ic_results:
+                all_results.append(ic_results)
+                print(f"  IC: {ic_results['ic_mean']:.4f}, RankIC: {ic_results['rankic_mean']:.4f}")
+            
+            quantile_returns = res['quantile']
+            if quantile_returns:
+                print(f"  Long-Short: {quantile_returns['long_short']:.6f}")
+            
+            # 生成图表
+            if not args.no_plots:
+                generate_visualizations(symbol, quantile_returns, output_dir, ax)
+            print()
+    
+    if fig is not None:
+        plt.close(fig)
     
     # 汇总结果
     if all_results:
@@ -284,6 +376,12 @@ def main():
         summary_df.to_csv(summary_path, index=False)
         print(f"IC summary saved to {summary_path}")
         
+        # 逐日 IC 明细（长表），最后一次性写出
+        if daily_rows:
+            daily_path = output_dir / "day3_ofi_ic_daily.parquet"
+            pd.DataFrame(daily_rows).to_parquet(daily_path, index=False)
+            print(f"Daily IC saved to {daily_path}")
+        
         # 生成Markdown报告
         generate_report(summary_df, output_dir)
     else:
@@ -5,6 +5,8 @@ Backtest Metrics and Performance Analysis
 import numpy as np
 from typing import Union
 
+from ..utils.jit import njit
+
 
 def calculate_sharpe_ratio(returns: np.ndarray, risk_free_rate: float = 0.0) -> float:
     """
@@ -17,9 +19,10 @@ def calculate_sharpe_ratio(returns: np.ndarray, risk_free_rate: float = 0.0) ->
     Returns:
         float: Sharpe ratio
     """
-    excess_returns = returns - risk_free_rate
-    std = float(np.std(excess_returns))
-    return float(np.mean(excess_returns)) / std if std != 0.0 else 0.0
+    # Std is shift-invariant: subtract the risk-free rate from the mean only, no excess-return array
+    returns = np.asarray(returns, dtype=np.float64)
+    std = float(returns.std())
+    return (float(returns.mean()) - risk_free_rate) / std if std != 0.0 else 0.0
 
 
 def calculate_max_drawdown(equity_curve: np.ndarray) -> float:
@@ -34,6 +37,21 @@ def calculate_max_drawdown(equity_curve: np.ndarray) -> float:
     """
     if len(equity_curve) == 0:
         return 0.0
-    peak = np.maximum.accumulate(equity_curve)
-    drawdown = (equity_curve - peak) / peak
-    return float(np.min(drawdown))
+    return float(_max_drawdown(np.ascontiguousarray(equity_curve, dtype=np.float64)))
+
+
+@njit(cache=True, error_model="numpy")
+def _max_drawdown(eq: np.ndarray) -> float:
+    """Single pass: running peak and worst drawdown, no temporaries"""
+    peak = eq[0]
+    worst = 0.0
+    for i in range(eq.shape[0]):
+        if eq[i] > peak:
+            peak = eq[i]
+        dd = (eq[i] - peak) / peak
+        if dd != dd:
+            # NaN propagates, as np.min would
+            return dd
+        if dd < worst:
+            worst = dd
+    return worst
@@ -0,0 +1,114 @@
+# src/build_ofi.py
+"""
+构建分钟级 OFI：每个 (symbol, date) 读 tick -> 多档 OFI -> 分钟聚合 -> 写 parquet
+输出 {cfg.ofi.output_dir}/{symbol}/{date}.parquet，signal_analysis 直接读
+"""
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import hashlib
+import os
+import pandas as pd
+from joblib import Parallel, delayed
+
+from src.io_lob import read_raw_lob
+from src.ofi import aggregate_to_minute, compute_ofi_per_tick
+from src.pipeline_io import Config, load_config, load_universe
+from src.pipeline_io_cache import cached_iter_universe
+
+# 每个 symbol 输出目录下的版本戳：OFI 代码或参数变了，已有输出全部视为过期
+VERSION_FILE = "_ofi_version"
+
+
+def ofi_version(cfg: Config) -> str:
+    """OFI 计算代码（ofi.py / ofi_core.py）源码 + levels/bar/agg 的短哈希"""
+    h = hashlib.sha1()
+    for mod in ("ofi.py", "ofi_core.py"):
+        h.update((Path(__file__).parent / mod).read_bytes())
+    h.update(f"{cfg.ofi.levels}|{cfg.ofi.bar}|{cfg.ofi.agg}".encode())
+    return h.hexdigest()[:8]
+
+
+def _load_ticks(path: Path, src: str, symbol: str, date: str) -> pd.DataFrame:
+    if src == "processed":
+        return pd.read_parquet(path)
+    if src == "raw":
+        return read_raw_lob(path, default_symbol=symbol, default_date=date)
+    raise ValueError(f"unknown source={src}")
+
+
+def _one_day(task: tuple, levels: int, bar: str, agg: str) -> tuple:
+    """处理单个 (symbol, date)，返回 (status, sym, date, err)"""
+    sym, date, path, src, op = task
+    try:
+        df = _load_ticks(path, src, sym, date)
+        tick = compute_ofi_per_tick(df, levels=levels).set_index("ts")
+        res = aggregate_to_minute(tick, bar=bar, agg=agg)
+        res.to_parquet(op, engine="pyarrow", index=True, compression="zstd")
+        return "ok", sym, date, ""
+    except Exception as e:
+        return "fail", sym, date, f"{type(e).__name__}: {str(e)[:100]}"
+
+
+def run_ofi_pipeline(cfg: Config, n_jobs: int = -1) -> tuple:
+    """并行构建全部分钟 OFI，返回 (done, skip, fail)"""
+    universe = load_universe(cfg.data.universe_file)
+    out_dir = cfg.ofi.output_dir
+
+    version = ofi_version(cfg)
+
+    # 先摊平成任务列表，已有输出（版本一致且不要求覆盖）直接跳过
+    tasks = []
+    skip = 0
+    files_by_sym = cached_iter_universe(cfg, universe)
+    for sym in universe:
+        sym_dir = out_dir / sym
+        sym_dir.mkdir(parents=True, exist_ok=True)
+        stamp = sym_dir / VERSION_FILE
+        fresh = stamp.exists() and stamp.read_text().strip() == version
+        existing = set(os.listdir(sym_dir)) if fresh and not cfg.ofi.overwrite else set()
+        for sym, date, path, src in files_by_sym[sym]:
+            if f"{date}.parquet" in existing:
+                skip += 1
+                continue
+            tasks.append((sym, date, path, src, sym_dir / f"{date}.parquet"))
+
+    print(f"Tasks: {len(tasks)}, skip={skip}")
+
+    # 每天互相独立，loky 多进程；batch_size 交给 joblib 自适应
+    results = Parallel(n_jobs=n_jobs, backend="loky", batch_size="auto", return_as="generator")(
+        delayed(_one_day)(t, cfg.ofi.levels, cfg.ofi.bar, cfg.ofi.agg) for t in tasks
+    )
+    done = fail = 0
+    failed_syms = set()
+    for status, sym, date, err in results:
+        if status == "ok":
+            done += 1
+            if done % 50 == 0:
+                print(f"[OK] done={done} skip={skip} fail={fail}")
+        else:
+            fail += 1
+            failed_syms.add(sym)
+            print(f"[FAIL] {sym} {date} err={err}")
+
+    # 全部成功的 symbol 才打上当前版本戳，失败的下次整目录重算
+    for sym in universe:
+        if sym not in failed_syms:
+            (out_dir / sym / VERSION_FILE).write_text(version)
+    return done, skip, fail
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", type=str, default="configs/data.yaml")
+    ap.add_argument("--jobs", type=int, default=-1)
+    args = ap.parse_args()
+
+    cfg = load_config(args.config)
+    done, skip, fail = run_ofi_pipeline(cfg, n_jobs=args.jobs)
+    print(f"\nFinished. done={done} skip={skip} fail={fail}")
+    print(f"OFI saved to: {cfg.ofi.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
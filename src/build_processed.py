@@ -2,7 +2,10 @@
 from __future__ import annotations
 from pathlib import Path
 import argparse
-from src.io_lob import convert_one_day, processed_path
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from src.io_lob import convert_one_day
 
 def main():
     ap = argparse.ArgumentParser()
@@ -11,6 +14,7 @@ def main():
     ap.add_argument("--symbol", type=str, default="ALL")   # ALL 或 159915.XSHE
     ap.add_argument("--year", type=str, default="ALL")     # ALL 或 2021 或 2021,2022
     ap.add_argument("--overwrite", action="store_true")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
     args = ap.parse_args()
 
     raw_root = Path(args.raw_root)
@@ -22,9 +26,19 @@ def main():
     else:
         years = [y.strip() for y in args.year.split(",")]
 
-    total = 0
+    # 已转换的 (symbol, date) -> 转换时 raw 文件的 mtime，记在 manifest 里一次读入
+    manifest_path = processed_root / "manifest.parquet"
+    done = {}
+    manifest_mtime = -1.0
+    if manifest_path.exists() and (not args.overwrite):
+        m = pd.read_parquet(manifest_path, columns=["symbol", "date", "mtime"])
+        done = dict(zip(zip(m["symbol"], m["date"]), m["mtime"]))
+        manifest_mtime = manifest_path.stat().st_mtime
+
+    # 先收集全部待转换文件，再并行转换
+    tasks = []      # (raw_file, symbol, date, raw mtime)
+    new_done = []   # 本次新登记的 (symbol, date, raw mtime)
     skipped = 0
-    failed = 0
 
     for y in years:
         year_dir = raw_root / str(y)
@@ -42,24 +56,58 @@ def main():
             if not sym_dir.exists():
                 continue
 
-            files = sorted(sym_dir.glob("*.csv.gz"))
-            if not files:
-                continue
+            # 每个 symbol 只 stat 一次 raw 目录、列一次输出目录（processed_path 的 ticks/<sym>/<date>）：
+            # manifest 命中、输出日期目录还在、raw 目录在 manifest 写入后没变动过的，直接跳过，不逐文件 stat
+            # raw 目录有新增/替换（mtime 晚于 manifest）才逐个比对 mtime；原地覆盖写的 csv 需 --overwrite
+            suspect = sym_dir.stat().st_mtime > manifest_mtime
+            out_sym = processed_root / "ticks" / sym
+            out_dates = {e.name for e in os.scandir(out_sym) if e.is_dir()} if out_sym.is_dir() else set()
 
-            for f in files:
+            for f in sorted(sym_dir.glob("*.csv.gz")):
                 date_str = f.stem.split(".")[0]  # 2021-01-04
-                out = processed_path(processed_root, sym, date_str)
-                if out.exists() and (not args.overwrite):
-                    skipped += 1
-                    continue
-                try:
-                    convert_one_day(f, processed_root)
-                    total += 1
-                    if total % 200 == 0:
-                        print(f"[OK {total}] (skipped={skipped}, failed={failed}) last={sym} {date_str}")
-                except Exception as e:
-                    failed += 1
-                    print(f"[FAIL] {f} -> {e}")
+                if not args.overwrite and date_str in out_dates:
+                    recorded = done.get((sym, date_str))
+                    if recorded is not None and not suspect:
+                        skipped += 1
+                        continue
+                    mtime = f.stat().st_mtime
+                    if recorded is None:
+                        # 不在 manifest 里但输出已存在（manifest 之前转好的）：补登记，不重转
+                        skipped += 1
+                        new_done.append((sym, date_str, mtime))
+                        continue
+                    if recorded == mtime:
+                        skipped += 1
+                        continue
+                tasks.append((f, sym, date_str, f.stat().st_mtime))
+
+    total = 0
+    failed = 0
+
+    # 每个文件 解压+解析+写parquet 都是独立的 CPU 活，按文件多进程
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        futures = {ex.submit(convert_one_day, f, processed_root): (f, sym, date_str, mtime)
+                   for f, sym, date_str, mtime in tasks}
+        for fut in as_completed(futures):
+            f, sym, date_str, mtime = futures[fut]
+            try:
+                fut.result()
+                total += 1
+                new_done.append((sym, date_str, mtime))
+                if total % 200 == 0:
+                    print(f"[OK {total}] (skipped={skipped}, failed={failed}) last={sym} {date_str}")
+            except Exception as e:
+                failed += 1
+                print(f"[FAIL] {f} -> {e}")
+
+    # 新完成的条目并入 manifest（--overwrite 重转的同键覆盖）；mtime 用收集任务时记下的，不再 stat
+    if new_done:
+        add = pd.DataFrame(new_done, columns=["symbol", "date", "mtime"])
+        if manifest_path.exists():
+            add = pd.concat([pd.read_parquet(manifest_path), add], ignore_index=True)
+            add = add.drop_duplicates(["symbol", "date"], keep="last")
+        processed_root.mkdir(parents=True, exist_ok=True)
+        add.sort_values(["symbol", "date"]).to_parquet(manifest_path, index=False)
 
     print(f"Done. OK={total}, skipped={skipped}, failed={failed}")
 
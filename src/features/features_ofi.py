@@ -1,28 +1,56 @@
 import pandas as pd
 import numpy as np
-from ..ofi import compute_ofi_l1
+from ..ofi_core import ofi_l1_arr
+from ..utils.jit import njit
+from ..utils.time import minute_segments
+
+
+@njit(cache=True)
+def _segment_median(x, starts, lasts):
+    # 每段 [starts[k], lasts[k]] 的中位数，跳过 NaN（同 groupby.median）；np.median 内部是 quickselect
+    out = np.full(len(starts), np.nan)
+    for k in range(len(starts)):
+        seg = x[starts[k]:lasts[k] + 1]
+        seg = seg[~np.isnan(seg)]
+        if len(seg):
+            out[k] = np.median(seg)
+    return out
 
 def make_1m_features_one_day(df: pd.DataFrame) -> pd.DataFrame:
     # Input: one-day ticks LOB DataFrame
     # Output: one-day 1m bars LOB DataFrame
-    df = df.sort_values("ts").copy()
-    
-    df["mid"] = (df["a1_p"] + df["b1_p"]) / 2.0
-    df["spread"] = df["a1_p"] - df["b1_p"]
-    
-    df["ofi1"] = compute_ofi_l1(df)
-    df["minute"] = df["ts"].dt.floor("min")# type: ignore
+    df = df.sort_values("ts")  # sort_values 已返回新对象，不再额外 copy
+
+    a1_p = df["a1_p"].to_numpy(dtype=np.float64)
+    b1_p = df["b1_p"].to_numpy(dtype=np.float64)
+    mid = (a1_p + b1_p) / 2.0
+    spread = a1_p - b1_p
+    ofi1 = ofi_l1_arr(b1_p, df["b1_v"].to_numpy(), a1_p, df["a1_v"].to_numpy())
+
+    # ts 已排序，同一分钟是连续一段：按段边界 reduceat，不再 groupby 哈希
+    # NaT 排在最后，和 groupby 一样不参与分组
+    n = int(df["ts"].notna().sum())
+    starts, lasts, minutes = minute_segments(df["ts"].to_numpy()[:n])
+    mid, spread, ofi1 = mid[:n], spread[:n], ofi1[:n]
 
-    g = df.groupby("minute", sort=True)
+    # 段内最后一个非 NaN 的 mid（同 groupby.last）
+    ok = np.flatnonzero(~np.isnan(mid))
+    pos = np.searchsorted(ok, lasts, side="right") - 1
+    has = (pos >= 0) & (ok[np.maximum(pos, 0)] >= starts) if len(ok) else np.zeros(len(starts), dtype=bool)
+    mid_last = np.full(len(starts), np.nan)
+    mid_last[has] = mid[ok[pos[has]]]
 
     out = pd.DataFrame({
-        "ofi1_sum": g["ofi1"].sum(),
-        "mid_last": g["mid"].last(),
-        "spread_med": g["spread"].median(),
-        "n_ticks": g.size(),
-    }).reset_index()
+        "minute": minutes,
+        "ofi1_sum": np.add.reduceat(ofi1, starts) if n else np.empty(0),
+        "mid_last": mid_last,
+        "spread_med": _segment_median(spread, starts, lasts),
+        "n_ticks": lasts - starts + 1,
+    })
 
     # 下一分钟收益（用分钟末 mid）
-    out["ret_fwd_1m"] = np.log(out["mid_last"].shift(-1) / out["mid_last"])
+    ret = np.full(len(mid_last), np.nan)
+    ret[:-1] = np.log(mid_last[1:] / mid_last[:-1])
+    out["ret_fwd_1m"] = ret
 
-    return out
\ No newline at end of file
+    return out
@@ -6,6 +6,8 @@ import re
 import pandas as pd
 import numpy as np
 
+from .ofi_core import fits_int32, price_to_ticks
+
 
 PX_COLS = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
 VOL_COLS = [f"a{k}_v" for k in range(1, 6)] + [f"b{k}_v" for k in range(1, 6)]
@@ -21,6 +23,46 @@ def _clean_time_to_digits(s: pd.Series) -> pd.Series:
     x = x.str.replace(r"\D+", "", regex=True)
     return x
 
+def _parse_ts_numeric(s: pd.Series) -> pd.Series | None:
+    """
+    快路径：time 是整数（或整值 float）且整列统一 14 位 / 17 位时，直接整数拆字段，不走字符串
+    其它情况返回 None，交给 _parse_ts 的字符串逻辑
+    """
+    if pd.api.types.is_integer_dtype(s.dtype):
+        t = s.to_numpy(dtype=np.int64)
+    elif pd.api.types.is_float_dtype(s.dtype):
+        v = s.to_numpy(dtype=np.float64)
+        # 17 位已超出 float64 精确整数范围，只接受 14 位
+        if len(v) == 0 or not (np.isfinite(v).all() and (v == np.floor(v)).all() and v.max() < 1e15):
+            return None
+        t = v.astype(np.int64)
+    else:
+        return None
+
+    if len(t) == 0:
+        return None
+    lo, hi = t.min(), t.max()
+    if lo >= 10**13 and hi < 10**14:
+        sec, ms = t, None
+    elif lo >= 10**16 and hi < 10**17:
+        sec, ms = t // 1000, t % 1000
+    else:
+        return None
+
+    ts = pd.to_datetime(pd.DataFrame({
+        "year": sec // 10**10,
+        "month": sec // 10**8 % 100,
+        "day": sec // 10**6 % 100,
+        "hour": sec // 10**4 % 100,
+        "minute": sec // 100 % 100,
+        "second": sec % 100,
+    }), errors="coerce").astype("datetime64[ns]")
+    if ms is not None:
+        ts = ts + pd.to_timedelta(ms, unit="ms")
+    ts.index = s.index
+    return ts
+
+
 def _parse_ts(df: pd.DataFrame) -> pd.Series:
     """
     兼容两类常见格式：
@@ -28,6 +70,10 @@ def _parse_ts(df: pd.DataFrame) -> pd.Series:
     2) time = YYYYMMDDHHMMSSfff (17位，毫秒3位) => 补成6位微秒解析
     若 time 不是这两类，则 fallback: 用 date + (time当作HHMMSS 或 HHMMSSfff) —— 但你这份看起来是第一类。
     """
+    ts = _parse_ts_numeric(df["time"])
+    if ts is not None and ts.notna().all():
+        return ts
+
     t = _clean_time_to_digits(df["time"])
 
     # 优先：如果已经是带日期的14/17位
@@ -58,7 +104,16 @@ def _parse_ts(df: pd.DataFrame) -> pd.Series:
     return ts
 
 
-def read_raw_lob_csv(path: Path, default_symbol: str | None = None, default_date: str | None = None) -> pd.DataFrame:
+def read_raw_lob_csv(
+    path: Path,
+    default_symbol: str | None = None,
+    default_date: str | None = None,
+    price_ticks: bool = False,
+) -> pd.DataFrame:
+    """
+    price_ticks=True 时十档价格转成 int32 定点 tick（×PRICE_SCALE），量转 int32，
+    供整数 OFI 内核使用；默认仍输出 float 价格
+    """
     df = pd.read_csv(path, compression="gzip")
     df.columns = [c.strip().lower() for c in df.columns]
 
@@ -78,8 +133,9 @@ def read_raw_lob_csv(path: Path, default_symbol: str | None = None, default_date
     if missing:
         raise ValueError(f"Missing required columns in {path.name}: {missing}")
 
-    df["code"] = df["code"].astype(str)
-    df["date"] = df["date"].astype(str)
+    # 一个文件只有一个 code / date：category 只存一份字符串 + 整数编码，写 parquet 也是字典编码
+    df["code"] = df["code"].astype(str).astype("category")
+    df["date"] = df["date"].astype(str).astype("category")
 
     ts = _parse_ts(df)
     if ts.isna().any():
@@ -91,19 +147,63 @@ def read_raw_lob_csv(path: Path, default_symbol: str | None = None, default_date
 
     num_cols = ["current", "volume", "money"] + PX_COLS + VOL_COLS
     for c in num_cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+        # read_csv 已推断成数值的列直接跳过，只有混了脏字符串的列才逐列 coerce
+        if not pd.api.types.is_numeric_dtype(df[c].dtype):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
 
     if "maybe_truncated" not in df.columns:
         df["maybe_truncated"] = np.nan
     
-    px_cols = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
-    valid = df[px_cols].notna().all(axis=1) & (df[px_cols] > 0).all(axis=1)
-    df = df.loc[valid].copy()
+    # 十档价格一次取成 ndarray 扫一遍；NaN 与 > 0 比较为 False，缺失也一并过滤
+    px = df[PX_COLS].to_numpy(dtype=np.float64)
+    valid = (px > 0).all(axis=1)
+    df = df.loc[valid]  # 布尔索引本身就是新对象
+
+    if price_ticks:
+        # 要逐列赋值：拷一份，免得 pandas < 3 对布尔索引结果报 chained assignment 警告
+        df = df.copy()
+        # 价格已过滤掉 NaN/非正；×PRICE_SCALE 超出 int32 就整体保持 float，不回绕
+        try:
+            ticks = {c: price_to_ticks(df[c].to_numpy()) for c in PX_COLS}
+        except OverflowError:
+            ticks = {}
+        for c, t in ticks.items():
+            df[c] = t
+        # 量有缺失、非整数或 >= 2**31 就保持原样
+        for c in VOL_COLS:
+            if fits_int32(df[c].to_numpy()):
+                df[c] = df[c].astype(np.int32)
 
     return df
 
 
 
+def raw_parquet_twin(raw_file: Path) -> Path:
+    # 2021-01-04.csv.gz -> 2021-01-04.parquet（scripts/raw_csv_to_parquet.py 生成）
+    return raw_file.with_name(raw_file.name.split(".")[0] + ".parquet")
+
+
+def twin_is_fresh(raw_file: Path, twin: Path) -> bool:
+    """孪生 parquet 存在且不比 csv 旧；csv 重新下载后旧孪生作废"""
+    try:
+        return twin.stat().st_mtime >= raw_file.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def read_raw_lob(raw_file: Path, default_symbol: str | None = None, default_date: str | None = None) -> pd.DataFrame:
+    """优先读 zstd parquet 孪生文件（已是 read_raw_lob_csv 的解析结果），没有或已过期才解压解析 csv"""
+    if raw_file.suffix == ".parquet":
+        # 传进来的就是孪生文件（如文件索引缓存里的路径）：对应 csv 更新过就改读 csv
+        csv = raw_file.with_name(raw_file.name.split(".")[0] + ".csv.gz")
+        if not csv.exists() or twin_is_fresh(csv, raw_file):
+            return pd.read_parquet(raw_file)
+        raw_file = csv
+    elif twin_is_fresh(raw_file, raw_parquet_twin(raw_file)):
+        return pd.read_parquet(raw_parquet_twin(raw_file))
+    return read_raw_lob_csv(raw_file, default_symbol=default_symbol, default_date=default_date)
+
+
 def raw_path(root: Path, year: int, symbol: str, date_str: str) -> Path:
     return root / str(year) / symbol / f"{date_str}.csv.gz"
 
@@ -118,14 +218,14 @@ def convert_one_day(raw_file: Path, processed_root: Path) -> Path:
     # 注意：你的文件名是 2021-01-04.csv.gz，所以 stem 是 "2021-01-04.csv"
     # split(".")[0] 才能拿到 2021-01-04
 
-    df = read_raw_lob_csv(raw_file, default_symbol=symbol, default_date=date_str)
+    df = read_raw_lob(raw_file, default_symbol=symbol, default_date=date_str)
 
     # 这里用兜底后的字段
-    symbol = df["code"].iloc[0]
-    date_str = df["date"].iloc[0]
+    symbol = str(df["code"].iloc[0])
+    date_str = str(df["date"].iloc[0])
 
     out = processed_path(processed_root, symbol, date_str)
     out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(out, index=False)
+    df.to_parquet(out, index=False, compression="zstd")
     return out
 
@@ -0,0 +1,29 @@
+# src/io_lob_polars.py
+"""
+polars 读 raw tick csv.gz：build_labels / quality_check 共用
+单独成模块，io_lob 的使用方不必装 polars
+"""
+from __future__ import annotations
+from pathlib import Path
+import polars as pl
+
+
+# raw csv 里需要固定类型的列：价量一律 Float64，ts 保持字符串
+RAW_SCHEMA = {
+    "ts": pl.String,
+    **{f"{s}{i}_{k}": pl.Float64 for s in "ab" for i in range(1, 6) for k in "pv"},
+}
+
+
+def read_raw_csv_pl(path: Path) -> pl.DataFrame:
+    """
+    polars 自动识别 gzip、多线程解析；参差行截断
+    不开 ignore_errors：解析不了的值直接抛 ComputeError，不悄悄变成 null；
+    价量固定 Float64、ts 留字符串，其余列用全量数据推断类型
+    """
+    return pl.read_csv(
+        path,
+        infer_schema_length=None,
+        schema_overrides=RAW_SCHEMA,
+        truncate_ragged_lines=True,
+    )
@@ -3,58 +3,62 @@ import numpy as np
 import pandas as pd
 from typing import List
 
+from .ofi_core import mlofi_arr, ofi_l1_arr, ofi_l1_i32
+
 
 def _col(level: int, side: str, kind: str) -> str:
     return f"{side}{level}_{kind}"
 
 
 def ensure_datetime_index(df: pd.DataFrame) -> pd.DataFrame:
-    
-    out = df.copy()
-    out["time"] = pd.to_datetime(out["time"], errors="coerce")
-    out = out.dropna(subset=["time"]).sort_values("time")
-    out = out.set_index("time")
-    return out
+    # assign 返回新对象，不再先整表 copy
+    return (
+        df.assign(time=pd.to_datetime(df["time"], errors="coerce"))
+        .dropna(subset=["time"])
+        .sort_values("time")
+        .set_index("time")
+    )
+
+
+def compute_ofi_l1(df: pd.DataFrame) -> pd.Series:
+    """
+    一档 OFI，与 compute_ofi_per_tick(levels=1) 的 ofi1 一致
+    """
+    cols = ("b1_p", "b1_v", "a1_p", "a1_v")
+    if all(pd.api.types.is_integer_dtype(df[c].dtype) for c in cols):
+        # read_raw_lob_csv(price_ticks=True) 读出来的定点价格：走整数内核
+        res = ofi_l1_i32(*(np.ascontiguousarray(df[c].to_numpy()) for c in cols))
+    else:
+        res = ofi_l1_arr(*(df[c].to_numpy(dtype=np.float64) for c in cols))
+    return pd.Series(res, index=df.index, name="ofi1")
+
+
+def _level_matrix(df: pd.DataFrame, side: str, kind: str, levels: int) -> np.ndarray:
+    cols = [_col(i, side, kind) for i in range(1, levels + 1)]
+    return np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64))
 
 
 def compute_ofi_per_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
     """
     输出：添加列 ofi1..ofi{levels} 以及 ofi（sum）
     """
-    out = df.copy()
-
-    for i in range(1, levels + 1):
-        bp = out[_col(i, "b", "p")].astype(float)
-        ap = out[_col(i, "a", "p")].astype(float)
-        bv = out[_col(i, "b", "v")].astype(float)
-        av = out[_col(i, "a", "v")].astype(float)
-
-        bp_prev = bp.shift(1)
-        ap_prev = ap.shift(1)
-        bv_prev = bv.shift(1)
-        av_prev = av.shift(1)
-
-        # Δb_i
-        db = np.where(
-            bp > bp_prev, bv,
-            np.where(bp == bp_prev, bv - bv_prev, -bv_prev)
-        )
-
-        # Δa_i
-        da = np.where(
-            ap < ap_prev, av,
-            np.where(ap == ap_prev, av - av_prev, -av_prev)
-        )
-
-        ofi_i = db - da
-        out[f"ofi{i}"] = ofi_i
-
-    ofi_cols: List[str] = [f"ofi{i}" for i in range(1, levels + 1)]
-    out["ofi"] = out[ofi_cols].sum(axis=1, skipna=True)
-
-    # 第一行填 0.0
-    out[ofi_cols + ["ofi"]] = out[ofi_cols + ["ofi"]].replace([np.inf, -np.inf], np.nan).fillna(0.0)
-    return out
+    if levels == 1:
+        # 常见情形：只要一档，直接走一维 ofi1 内核，不拼 (n, levels) 矩阵
+        ofi1 = compute_ofi_l1(df).to_numpy()
+        ofi = pd.DataFrame({"ofi1": ofi1, "ofi": ofi1}, index=df.index)
+        return pd.concat([df.drop(columns=["ofi1", "ofi"], errors="ignore"), ofi], axis=1)
+
+    bp = _level_matrix(df, "b", "p", levels)
+    bv = _level_matrix(df, "b", "v", levels)
+    ap = _level_matrix(df, "a", "p", levels)
+    av = _level_matrix(df, "a", "v", levels)
+
+    # 第一行及 NaN 档位为 0.0
+    res = mlofi_arr(bp, bv, ap, av)
+
+    ofi_cols: List[str] = [f"ofi{i}" for i in range(1, levels + 1)] + ["ofi"]
+    ofi = pd.DataFrame(res, index=df.index, columns=ofi_cols)
+    return pd.concat([df.drop(columns=ofi_cols, errors="ignore"), ofi], axis=1)
 
 
 def aggregate_to_minute(ofi_tick: pd.DataFrame, bar: str = "1min", agg: str = "sum") -> pd.DataFrame:
@@ -0,0 +1,107 @@
+"""
+OFI 的纯 NumPy / numba 核心：只吃 ndarray、只吐 ndarray，pandas 包装见 ofi.py
+"""
+from __future__ import annotations
+import numpy as np
+
+from .utils.jit import njit
+
+# 价格定点化：1 tick = 1e-4 元
+PRICE_SCALE = 10000
+
+
+def ofi_l1_arr(bp: np.ndarray, bv: np.ndarray, ap: np.ndarray, av: np.ndarray) -> np.ndarray:
+    """
+    一档 OFI（Cont et al.），输入四个一维数组；即 mlofi_arr 的 levels=1 特例
+    价格缺失时按“下降”处理；非有限结果为 0
+    """
+    return mlofi_arr(*(np.asarray(x)[:, None] for x in (bp, bv, ap, av)))[:, 0]
+
+
+def fits_int32(x: np.ndarray) -> bool:
+    """整列都能无损转 int32：没有 NaN、都是整数、|x| < 2**31；空数组算能"""
+    x = np.asarray(x)
+    if x.size == 0 or (np.issubdtype(x.dtype, np.integer) and x.dtype.itemsize <= 4):
+        return True
+    m = np.abs(x).max()
+    # NaN 时比较为 False
+    return bool(m < 2**31) and (np.issubdtype(x.dtype, np.integer) or bool((x == np.rint(x)).all()))
+
+
+def price_to_ticks(px: np.ndarray, scale: int = PRICE_SCALE) -> np.ndarray:
+    """价格 -> int32 定点 tick（四舍五入）；有 NaN 或超出 int32 范围时抛 OverflowError，不静默回绕"""
+    t = np.rint(np.asarray(px, dtype=np.float64) * scale)
+    if not fits_int32(t):
+        raise OverflowError(f"prices do not fit int32 ticks at scale={scale}")
+    return t.astype(np.int32)
+
+
+@njit(cache=True, boundscheck=False)
+def ofi_l1_i32(bp, bv, ap, av):
+    """
+    一档 OFI 的整数版：价格为 int32 tick、量为整数，比较和差分都走整数
+    累加用 int64 防溢出，最后转一次 float64；首行为 0
+    """
+    n = bp.shape[0]
+    out = np.zeros(n)
+    for t in range(1, n):
+        if bp[t] > bp[t - 1]:
+            db = np.int64(bv[t])
+        elif bp[t] == bp[t - 1]:
+            db = np.int64(bv[t]) - np.int64(bv[t - 1])
+        else:
+            db = -np.int64(bv[t - 1])
+
+        if ap[t] < ap[t - 1]:
+            da = np.int64(av[t])
+        elif ap[t] == ap[t - 1]:
+            da = np.int64(av[t]) - np.int64(av[t - 1])
+        else:
+            da = -np.int64(av[t - 1])
+
+        out[t] = np.float64(db - da)
+    return out
+
+
+# 不开 nnan/ninf：靠显式比较把 NaN/inf 档位记 0（原先末尾的 replace(inf).fillna(0) 折进内核）
+@njit(cache=True, boundscheck=False, fastmath={"reassoc", "contract", "arcp", "nsz"})
+def _mlofi_kernel(bp, bv, ap, av, out):
+    """
+    bp/bv/ap/av: (n, levels)；out: (n, levels + 1)，前 levels 列为各档 OFI，最后一列为求和
+    首行及非有限档位保持 0
+    """
+    n, levels = bp.shape
+    for t in range(1, n):
+        s = 0.0
+        for m in range(levels):
+            if bp[t, m] > bp[t - 1, m]:
+                db = bv[t, m]
+            elif bp[t, m] == bp[t - 1, m]:
+                db = bv[t, m] - bv[t - 1, m]
+            else:
+                db = -bv[t - 1, m]
+
+            if ap[t, m] < ap[t - 1, m]:
+                da = av[t, m]
+            elif ap[t, m] == ap[t - 1, m]:
+                da = av[t, m] - av[t - 1, m]
+            else:
+                da = -av[t - 1, m]
+
+            x = db - da
+            # 不用 np.isfinite：在 fastmath 下会被折叠掉
+            if x == x and x != np.inf and x != -np.inf:
+                out[t, m] = x
+                s += x
+        out[t, levels] = s
+
+
+def mlofi_arr(bp: np.ndarray, bv: np.ndarray, ap: np.ndarray, av: np.ndarray) -> np.ndarray:
+    """
+    多档 OFI，输入四个 (n, levels) 数组；OFI 的唯一实现，其余入口都是它的包装
+    返回 (n, levels + 1)：前 levels 列为各档 OFI，最后一列为求和；首行及 NaN 档位为 0
+    """
+    bp, bv, ap, av = (np.ascontiguousarray(x, dtype=np.float64) for x in (bp, bv, ap, av))
+    out = np.zeros((bp.shape[0], bp.shape[1] + 1))
+    _mlofi_kernel(bp, bv, ap, av, out)
+    return out
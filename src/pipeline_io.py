@@ -70,6 +70,14 @@ def load_universe(universe_file: Path) -> List[str]:
     return sorted(list(dict.fromkeys(syms)))
 
 
+def _twin_is_fresh(raw_file: Path, twin: Path) -> bool:
+    # 同 io_lob.twin_is_fresh；这里不 import io_lob，免得列文件也拉起 numba
+    try:
+        return twin.stat().st_mtime >= raw_file.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
 def iter_daily_files(
     processed_dir: Path, raw_dir: Path, symbol: str, start: str, end: str
 ) -> Iterable[Tuple[str, str, Path, str]]:
@@ -81,28 +89,33 @@ def iter_daily_files(
     # 处理 processed 数据：支持两种格式
     # 1. symbol/date.parquet
     # 2. symbol/date/part.parquet
+    # os.scandir 只列名字：文件/目录类型取自目录项本身，不逐个 is_dir，也不打开 parquet footer
     if pdir.exists():
-        # 直接文件格式
-        candidates += [(p, "processed") for p in pdir.glob("*.parquet")]
-        # 目录格式
-        for date_dir in pdir.iterdir():
-            if date_dir.is_dir():
-                parquet_file = date_dir / "part.parquet"
-                if parquet_file.exists():
-                    candidates.append((parquet_file, "processed"))
+        with os.scandir(pdir) as it:
+            for e in it:
+                if e.name.endswith(".parquet") and e.is_file():
+                    candidates.append((Path(e.path), "processed"))
+                elif e.is_dir():
+                    parquet_file = Path(e.path) / "part.parquet"
+                    if parquet_file.exists():
+                        candidates.append((parquet_file, "processed"))
     
     # 处理 raw 数据：支持两种格式
     # 1. symbol/date.csv.gz
     # 2. symbol/date/part.csv.gz
+    # 有 zstd parquet 孪生文件（symbol/date.parquet 或 symbol/date/part.parquet）时优先用它
     if rdir.exists():
         # 直接文件格式
-        candidates += [(p, "raw") for p in rdir.glob("*.csv.gz")]
+        for p in rdir.glob("*.csv.gz"):
+            twin = p.with_name(p.name.split(".")[0] + ".parquet")
+            candidates.append((twin if _twin_is_fresh(p, twin) else p, "raw"))
         # 目录格式
         for date_dir in rdir.iterdir():
             if date_dir.is_dir():
                 csv_file = date_dir / "part.csv.gz"
                 if csv_file.exists():
-                    candidates.append((csv_file, "raw"))
+                    twin = date_dir / "part.parquet"
+                    candidates.append((twin if _twin_is_fresh(csv_file, twin) else csv_file, "raw"))
 
     for p, src in sorted(candidates, key=lambda x: x[0].name):
         # 从路径中提取日期：优先从父目录名获取
@@ -0,0 +1,98 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+import pandas as pd
+
+from src.pipeline_io import Config, iter_daily_files
+
+
+CACHE_FILE = Path("outputs/_cache/file_index.parquet")
+INDEX_COLS = ["symbol", "date", "path", "src", "processed_mtime", "raw_mtime", "start", "end"]
+
+
+def _dir_mtime(p: Path) -> int:
+    """
+    symbol 目录及其日期子目录 mtime 的最大值
+    日期目录内新建 part.parquet（raw_csv_to_parquet 生成孪生文件）只改日期目录的 mtime，
+    所以要连一层子目录一起看；一次 scandir，不遍历整棵树
+    """
+    try:
+        m = os.stat(p).st_mtime_ns
+        with os.scandir(p) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    m = max(m, e.stat(follow_symlinks=False).st_mtime_ns)
+        return m
+    except FileNotFoundError:
+        return -1
+
+
+def _load_index(cache_file: Path) -> pd.DataFrame:
+    if cache_file.exists():
+        try:
+            return pd.read_parquet(cache_file)
+        except Exception:
+            pass  # 缓存损坏就当没有，重新扫
+    return pd.DataFrame(columns=INDEX_COLS)
+
+
+def cached_iter_universe(
+    cfg: Config, symbols: Iterable[str], cache_file: Path = CACHE_FILE
+) -> Dict[str, List[Tuple[str, str, Path, str]]]:
+    """
+    iter_daily_files 的缓存版：某 symbol 的 processed/raw 目录（含日期子目录）mtime 和日期区间都没变时，
+    直接用 file_index.parquet 里的记录，不再遍历目录树。
+    索引整个 universe 只读一次、最多写一次。
+    注意：mtime 只反映文件的增删，已有文件被原地覆盖不会触发失效。
+    """
+    start, end = cfg.data.start, cfg.data.end
+    index = _load_index(cache_file)
+    cached = dict(tuple(index.groupby("symbol", sort=False))) if len(index) else {}
+
+    out = {}
+    fresh = []
+    for symbol in symbols:
+        key = (
+            _dir_mtime(cfg.data.processed_dir / symbol),
+            _dir_mtime(cfg.data.raw_dir / symbol),
+            start,
+            end,
+        )
+        hit = cached.get(symbol)
+        if hit is not None:
+            first = hit.iloc[0]
+            if (int(first["processed_mtime"]), int(first["raw_mtime"]), first["start"], first["end"]) == key:
+                out[symbol] = [(symbol, d, Path(p), s) for d, p, s in zip(hit["date"], hit["path"], hit["src"])]
+                continue
+
+        files = list(iter_daily_files(cfg.data.processed_dir, cfg.data.raw_dir, symbol, start, end))
+        out[symbol] = files
+        cached.pop(symbol, None)
+        # 空结果不落缓存（目录不存在时重扫本来就只是一次 stat）
+        if files:
+            fresh.append(pd.DataFrame({
+                "symbol": symbol,
+                "date": [f[1] for f in files],
+                "path": [str(f[2]) for f in files],
+                "src": [f[3] for f in files],
+                "processed_mtime": key[0],
+                "raw_mtime": key[1],
+                "start": start,
+                "end": end,
+            }, columns=INDEX_COLS))
+
+    if fresh or len(cached) < index["symbol"].nunique():
+        parts = list(cached.values()) + fresh
+        index = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=INDEX_COLS)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        index.to_parquet(cache_file, index=False)
+
+    return out
+
+
+def cached_iter_daily_files(
+    cfg: Config, symbol: str, cache_file: Path = CACHE_FILE
+) -> List[Tuple[str, str, Path, str]]:
+    """单个 symbol 的 cached_iter_universe；多个 symbol 请直接调 cached_iter_universe，索引只读写一次"""
+    return cached_iter_universe(cfg, [symbol], cache_file)[symbol]
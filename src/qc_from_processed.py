@@ -1,13 +1,21 @@
 # src/qc_from_processed.py
 from __future__ import annotations
 from pathlib import Path
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as papq
 
 PX_COLS = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
+# QC 只用到这些列，读 parquet 时按列投影
+QC_COLS = ["code", "date", "ts", "maybe_truncated"] + PX_COLS
 
 def qc_one_parquet(pq: Path) -> dict:
-    df = pd.read_parquet(pq)
+    names = set(papq.read_schema(pq).names)
+    table = papq.read_table(pq, columns=[c for c in QC_COLS if c in names])
+    df = table.to_pandas(self_destruct=True)
+    del table
 
     symbol = str(df["code"].iloc[0])
     date_str = str(df["date"].iloc[0])
@@ -44,6 +52,13 @@ def qc_one_parquet(pq: Path) -> dict:
         "file": str(pq),
     }
 
+def _qc_safe(pq: Path):
+    # 子进程里吞掉异常，交回主进程打印
+    try:
+        return qc_one_parquet(pq), None
+    except Exception as e:
+        return None, e
+
 def main():
     processed_root = Path("data/processed/ticks")
     out_file = Path("data/features/qc_all.parquet")
@@ -51,13 +66,16 @@ def main():
 
     parts = sorted(processed_root.glob("*/*/part.parquet"))
     rows = []
-    for i, pq in enumerate(parts, 1):
-        try:
-            rows.append(qc_one_parquet(pq))
-        except Exception as e:
-            print(f"[FAIL] {pq} -> {e}")
-        if i % 500 == 0:
-            print(f"[{i}/{len(parts)}] qc running...")
+    # 各文件互相独立，多进程并行
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        results = ex.map(_qc_safe, parts, chunksize=16)
+        for i, (pq, (row, err)) in enumerate(zip(parts, results), 1):
+            if err is None:
+                rows.append(row)
+            else:
+                print(f"[FAIL] {pq} -> {err}")
+            if i % 500 == 0:
+                print(f"[{i}/{len(parts)}] qc running...")
 
     qc = pd.DataFrame(rows).sort_values(["symbol", "date"])
     qc.to_parquet(out_file, index=False)
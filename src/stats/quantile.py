@@ -0,0 +1,40 @@
+"""
+分位数分组：np.quantile + searchsorted 代替 pd.qcut
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+def qcut_codes(x: np.ndarray, q: int) -> Optional[np.ndarray]:
+    """
+    与 pd.qcut(x, q, labels=False, duplicates='drop') 相同的组号（0 起）
+    区间左开右闭、最低组含左端点；重复分位点合并后不足两个边界时返回 None
+    调用方先去掉 NaN；空输入返回空组号（np.quantile 对空数组会报错）
+    """
+    if x.shape[0] == 0:
+        return np.empty(0, dtype=np.intp)
+    edges = np.unique(np.quantile(x, np.linspace(0.0, 1.0, q + 1)))
+    if edges.shape[0] < 2:
+        return None
+    codes = np.searchsorted(edges, x, side='left') - 1
+    return np.clip(codes, 0, edges.shape[0] - 2)
+
+
+def group_stats(codes: np.ndarray, y: np.ndarray):
+    """
+    按组号求均值、样本标准差（ddof=1，同 pandas）和计数，只返回非空组：
+    (组号, 均值, 标准差, 计数)
+    """
+    counts = np.bincount(codes)
+    sums = np.bincount(codes, weights=y)
+    nonempty = np.flatnonzero(counts)
+    n = counts[nonempty]
+    mean_full = np.zeros(counts.shape[0])
+    mean_full[nonempty] = sums[nonempty] / n
+    # 二阶中心矩：先减组均值再平方求和，比 E[x^2]-E[x]^2 稳
+    m2 = np.bincount(codes, weights=(y - mean_full[codes]) ** 2, minlength=counts.shape[0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.sqrt(m2[nonempty] / (n - 1))
+    return nonempty, mean_full[nonempty], std, n
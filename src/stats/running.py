@@ -0,0 +1,28 @@
+"""
+单遍（Welford）均值/标准差，逐个喂值，不保留历史
+"""
+
+import math
+
+
+class RunningMoments:
+    """Welford 累加器；NaN 直接跳过，std 为样本标准差（ddof=1）"""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: float) -> None:
+        if x != x:
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float("nan")
@@ -3,7 +3,9 @@ Time Utilities
 """
 
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Tuple
+
+import numpy as np
 
 
 def get_trading_days(start_date: datetime, end_date: datetime) -> List[datetime]:
@@ -31,3 +33,39 @@ def format_datetime(dt: datetime, fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
         str: Formatted datetime string
     """
     return dt.strftime(fmt)
+
+
+def minute_key(ts: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Integer minute bucket of datetime64 timestamps (floor division on the raw int64)
+    
+    Args:
+        ts: datetime64 array of any unit
+        
+    Returns:
+        (key, per_minute): int64 minute buckets, and how many ts units make one minute,
+        so ``(key * per_minute).view(ts.dtype)`` gives the floored minute labels
+    """
+    ts = np.asarray(ts)
+    unit, _ = np.datetime_data(ts.dtype)
+    per_minute = int(np.timedelta64(1, "m") // np.timedelta64(1, unit))
+    return ts.view("i8") // per_minute, per_minute
+
+
+def minute_segments(ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split time-sorted timestamps into per-minute segments
+    
+    Args:
+        ts: datetime64 array, sorted ascending
+        
+    Returns:
+        (starts, lasts, minutes): first/last row of each minute, and the
+        minute labels (floored, same datetime64 unit as ts)
+    """
+    ts = np.asarray(ts)
+    m, per_minute = minute_key(ts)
+    starts = np.flatnonzero(m[1:] != m[:-1]) + 1
+    starts = np.concatenate([np.zeros(min(len(m), 1), dtype=np.intp), starts])
+    lasts = np.append(starts[1:], len(m))[:len(starts)] - 1
+    return starts, lasts, (m[starts] * per_minute).view(ts.dtype)
@@ -0,0 +1,26 @@
+from dataclasses import replace
+from pathlib import Path
+
+from src.build_ofi import ofi_version
+from src.pipeline_io import Config, DataConfig, OfiConfig
+
+
+def _cfg(**ofi) -> Config:
+    data = DataConfig(Path("p"), Path("r"), Path("u"), "2021-01-01", "2021-12-31")
+    return Config(data=data, ofi=OfiConfig(**{
+        "levels": 5, "bar": "1min", "agg": "sum", "output_dir": Path("o"), "overwrite": False, **ofi,
+    }))
+
+
+def test_ofi_version_stable():
+    assert ofi_version(_cfg()) == ofi_version(_cfg())
+    # 输出目录 / overwrite 不影响结果，不该让已有输出失效
+    assert ofi_version(_cfg()) == ofi_version(_cfg(output_dir=Path("x"), overwrite=True))
+
+
+def test_ofi_version_changes_with_params():
+    base = _cfg()
+    versions = {ofi_version(base)}
+    for change in ({"levels": 1}, {"bar": "5min"}, {"agg": "mean"}):
+        versions.add(ofi_version(replace(base, ofi=replace(base.ofi, **change))))
+    assert len(versions) == 4
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi_core import fits_int32, mlofi_arr, ofi_l1_arr, ofi_l1_i32, price_to_ticks
+
+
+def _ofi_pandas(bp, bv, ap, av):
+    """重构前 ofi.compute_ofi_per_tick 的 pandas 写法，作为参照"""
+    cols = []
+    for m in range(bp.shape[1]):
+        b, a = pd.Series(bp[:, m]), pd.Series(ap[:, m])
+        v, w = pd.Series(bv[:, m]), pd.Series(av[:, m])
+        db = np.where(b > b.shift(1), v, np.where(b == b.shift(1), v - v.shift(1), -v.shift(1)))
+        da = np.where(a < a.shift(1), w, np.where(a == a.shift(1), w - w.shift(1), -w.shift(1)))
+        cols.append(db - da)
+    out = pd.DataFrame(np.column_stack(cols))
+    out["ofi"] = out.sum(axis=1, skipna=True)
+    return out.fillna(0.0).to_numpy()
+
+
+def _book(n, levels, seed=0):
+    rng = np.random.default_rng(seed)
+    # 价格只在 3 个价位间跳，保证大量相等（不变分支）
+    bp = 3.0 + rng.integers(0, 3, (n, levels)) / 1000
+    ap = bp + 0.001
+    bv = rng.integers(0, 1000, (n, levels)).astype(float)
+    av = rng.integers(0, 1000, (n, levels)).astype(float)
+    return bp, bv, ap, av
+
+
+@pytest.mark.parametrize("levels", [1, 5])
+def test_mlofi_matches_pandas(levels):
+    bp, bv, ap, av = _book(500, levels)
+    np.testing.assert_allclose(mlofi_arr(bp, bv, ap, av), _ofi_pandas(bp, bv, ap, av))
+
+
+def test_mlofi_nan_levels():
+    bp, bv, ap, av = _book(200, 3, seed=1)
+    bv[10, 1] = np.nan
+    ap[20, 2] = np.nan
+    av[30:33, 0] = np.nan
+    res = mlofi_arr(bp, bv, ap, av)
+    assert np.isfinite(res).all()
+    np.testing.assert_allclose(res, _ofi_pandas(bp, bv, ap, av))
+
+
+def test_mlofi_empty_and_single_row():
+    assert mlofi_arr(*(np.empty((0, 5)) for _ in range(4))).shape == (0, 6)
+    res = mlofi_arr(*(np.ones((1, 5)) for _ in range(4)))
+    np.testing.assert_array_equal(res, np.zeros((1, 6)))
+
+
+def test_ofi_l1_int_matches_float():
+    bp, bv, ap, av = (x[:, 0] for x in _book(500, 1, seed=2))
+    expect = ofi_l1_arr(bp, bv, ap, av)
+    got = ofi_l1_i32(price_to_ticks(bp), bv.astype(np.int32), price_to_ticks(ap), av.astype(np.int32))
+    np.testing.assert_array_equal(got, expect)
+
+
+def test_fits_int32_bounds():
+    assert fits_int32(np.array([0.0, 2.0**31 - 1]))
+    assert fits_int32(np.array([], dtype=float))
+    assert not fits_int32(np.array([2.0**31]))
+    assert not fits_int32(np.array([1.0, np.nan]))
+    assert not fits_int32(np.array([1.5]))
+    assert not fits_int32(np.array([2**40], dtype=np.int64))
+    with pytest.raises(OverflowError):
+        price_to_ticks(np.array([3.0e5]))
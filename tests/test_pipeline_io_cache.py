@@ -0,0 +1,74 @@
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from src.pipeline_io import Config, DataConfig, OfiConfig
+from src.pipeline_io_cache import cached_iter_daily_files, cached_iter_universe
+
+SYM = "159915.XSHE"
+
+
+def _cfg(root: Path) -> Config:
+    return Config(
+        data=DataConfig(
+            processed_dir=root / "processed",
+            raw_dir=root / "raw",
+            universe_file=root / "universe.yaml",
+            start="2021-01-01",
+            end="2021-12-31",
+        ),
+        ofi=OfiConfig(levels=5, bar="1min", agg="sum", output_dir=root / "ofi", overwrite=False),
+    )
+
+
+def _touch(p: Path) -> None:
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(b"")
+
+
+def _dates(files):
+    return [(d, Path(p).name, src) for _, d, p, src in files]
+
+
+def test_cache_hit_does_not_rewrite(tmp_path):
+    cfg, cache = _cfg(tmp_path), tmp_path / "index.parquet"
+    _touch(cfg.data.processed_dir / SYM / "2021-01-04" / "part.parquet")
+    first = cached_iter_daily_files(cfg, SYM, cache)
+    mtime = cache.stat().st_mtime_ns
+    assert cached_iter_daily_files(cfg, SYM, cache) == first
+    assert cache.stat().st_mtime_ns == mtime
+
+
+def test_new_date_dir_invalidates(tmp_path):
+    cfg, cache = _cfg(tmp_path), tmp_path / "index.parquet"
+    _touch(cfg.data.processed_dir / SYM / "2021-01-04" / "part.parquet")
+    assert _dates(cached_iter_daily_files(cfg, SYM, cache)) == [("2021-01-04", "part.parquet", "processed")]
+    time.sleep(0.01)
+    _touch(cfg.data.processed_dir / SYM / "2021-01-05" / "part.parquet")
+    assert [d for d, _, _ in _dates(cached_iter_daily_files(cfg, SYM, cache))] == ["2021-01-04", "2021-01-05"]
+
+
+def test_twin_inside_date_dir_invalidates(tmp_path):
+    # raw_csv_to_parquet 在已有日期目录里生成 part.parquet：symbol 目录 mtime 不变
+    cfg, cache = _cfg(tmp_path), tmp_path / "index.parquet"
+    _touch(cfg.data.raw_dir / SYM / "2021-01-04" / "part.csv.gz")
+    assert _dates(cached_iter_daily_files(cfg, SYM, cache)) == [("2021-01-04", "part.csv.gz", "raw")]
+    time.sleep(0.01)
+    _touch(cfg.data.raw_dir / SYM / "2021-01-04" / "part.parquet")
+    assert _dates(cached_iter_daily_files(cfg, SYM, cache)) == [("2021-01-04", "part.parquet", "raw")]
+
+
+def test_universe_index_keeps_other_symbols(tmp_path):
+    cfg, cache = _cfg(tmp_path), tmp_path / "index.parquet"
+    syms = [SYM, "510300.XSHG", "000000.MISSING"]
+    for s in syms[:2]:
+        _touch(cfg.data.processed_dir / s / "2021-01-04.parquet")
+    files = cached_iter_universe(cfg, syms, cache)
+    assert files["000000.MISSING"] == []
+    assert sorted(pd.read_parquet(cache)["symbol"].unique()) == sorted(syms[:2])
+    # 只刷新一个 symbol，另一个的缓存行不能丢
+    time.sleep(0.01)
+    _touch(cfg.data.processed_dir / SYM / "2021-01-05.parquet")
+    cached_iter_universe(cfg, [SYM], cache)
+    assert pd.read_parquet(cache).groupby("symbol").size().to_dict() == {SYM: 2, "510300.XSHG": 1}
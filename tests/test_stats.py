@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.stats.ic_numba import corr_pvalue, ic_and_rankic, ic_and_rankic_batch
+from src.stats.quantile import group_stats, qcut_codes
+from src.stats.running import RunningMoments
+
+
+def _xy(n, seed=0, ties=False):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    y = 0.3 * x + rng.normal(size=n)
+    if ties:
+        # 大量并列值，检验平均秩
+        x, y = np.round(x), np.round(y * 2) / 2
+    return x, y
+
+
+@pytest.mark.parametrize("ties", [False, True])
+def test_ic_and_rankic_matches_scipy(ties):
+    x, y = _xy(300, ties=ties)
+    ic, rankic, n = ic_and_rankic(x, y)
+    assert n == 300
+    assert ic == pytest.approx(stats.pearsonr(x, y)[0], abs=1e-12)
+    assert rankic == pytest.approx(stats.spearmanr(x, y)[0], abs=1e-12)
+    assert corr_pvalue(ic, n) == pytest.approx(stats.pearsonr(x, y)[1], rel=1e-9)
+    assert corr_pvalue(rankic, n) == pytest.approx(stats.spearmanr(x, y)[1], rel=1e-9)
+
+
+def test_ic_degenerate_inputs():
+    for x in (np.empty(0), np.array([1.0])):
+        ic, rankic, n = ic_and_rankic(x, x)
+        assert np.isnan(ic) and np.isnan(rankic) and n == len(x)
+    # 常数列：scipy 给 NaN，这里也是 NaN
+    ic, rankic, _ = ic_and_rankic(np.ones(5), np.arange(5.0))
+    assert np.isnan(ic) and np.isnan(rankic)
+    assert np.isnan(corr_pvalue(0.5, 2))
+
+
+def test_ic_batch_matches_single():
+    x, y = _xy(100, seed=3, ties=True)
+    offsets = np.array([0, 1, 40, 40, 100])
+    ic, rankic, n = ic_and_rankic_batch(x, y, offsets)
+    for d in range(len(offsets) - 1):
+        a, b = offsets[d], offsets[d + 1]
+        exp = ic_and_rankic(x[a:b], y[a:b])
+        np.testing.assert_equal((ic[d], rankic[d], n[d]), exp)
+
+
+@pytest.mark.parametrize("x", [
+    np.random.default_rng(0).normal(size=1000),
+    np.repeat(np.arange(7.0), [300, 1, 1, 1, 1, 1, 300]),   # 分位点重复，合并边界
+    np.array([1.0, 1.0, 1.0, 2.0]),
+    np.empty(0),
+])
+def test_qcut_codes_matches_pandas(x):
+    got = qcut_codes(x, 5)
+    expect = pd.qcut(x, 5, labels=False, duplicates="drop")
+    np.testing.assert_array_equal(got, expect)
+
+
+@pytest.mark.parametrize("x", [np.array([1.0]), np.full(10, 2.0)])
+def test_qcut_codes_single_edge(x):
+    # pandas 此时全是 NaN，调用方改走 pd.cut
+    assert qcut_codes(x, 5) is None
+    assert pd.isna(pd.qcut(x, 5, labels=False, duplicates="drop")).all()
+
+
+def test_group_stats_matches_pandas():
+    rng = np.random.default_rng(1)
+    codes = rng.integers(0, 5, 200)
+    codes[codes == 2] = 3        # 留一个空组
+    codes[0] = 4
+    codes[codes == 4] = 1
+    codes[0] = 4                 # 组 4 只有一个元素：std 为 NaN
+    y = rng.normal(size=200)
+    groups, mean, std, n = group_stats(codes, y)
+    ref = pd.Series(y).groupby(codes).agg(["mean", "std", "count"])
+    np.testing.assert_array_equal(groups, ref.index)
+    np.testing.assert_allclose(mean, ref["mean"])
+    np.testing.assert_allclose(std, ref["std"])
+    np.testing.assert_array_equal(n, ref["count"])
+
+
+@pytest.mark.parametrize("vals", [
+    [],
+    [1.5],
+    [1.0, np.nan, 2.0, 4.0, np.nan],
+    list(1e9 + np.random.default_rng(2).normal(size=500)),   # 大均值小方差：Welford 数值稳定
+])
+def test_running_moments_matches_pandas(vals):
+    rm = RunningMoments()
+    for v in vals:
+        rm.update(v)
+    s = pd.Series(vals, dtype=float)
+    assert rm.n == s.count()
+    if rm.n:
+        assert rm.mean == pytest.approx(s.mean(), rel=1e-12)
+    if rm.n > 1:
+        assert rm.std == pytest.approx(s.std(), rel=1e-9)
+    else:
+        assert np.isnan(rm.std) and np.isnan(s.std())
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.time import minute_key, minute_segments
+
+
+@pytest.mark.parametrize("unit", ["ns", "us", "ms", "s"])
+def test_minute_segments_matches_pandas(unit):
+    rng = np.random.default_rng(0)
+    ts = pd.Timestamp("2021-01-04 09:30") + pd.to_timedelta(np.sort(rng.integers(0, 3600, 2000)), unit="s")
+    ts = ts.to_numpy().astype(f"datetime64[{unit}]")
+    starts, lasts, minutes = minute_segments(ts)
+    ref = pd.Series(np.arange(len(ts))).groupby(pd.DatetimeIndex(ts).floor("min")).agg(["first", "last"])
+    np.testing.assert_array_equal(starts, ref["first"])
+    np.testing.assert_array_equal(lasts, ref["last"])
+    np.testing.assert_array_equal(minutes.astype("datetime64[ns]"), ref.index.to_numpy())
+    assert minutes.dtype == ts.dtype
+
+
+def test_minute_segments_empty_and_single():
+    starts, lasts, minutes = minute_segments(np.array([], dtype="datetime64[ns]"))
+    assert len(starts) == len(lasts) == len(minutes) == 0
+    ts = np.array(["2021-01-04T09:30:59.5"], dtype="datetime64[ns]")
+    starts, lasts, minutes = minute_segments(ts)
+    assert list(starts) == [0] and list(lasts) == [0]
+    assert minutes[0] == np.datetime64("2021-01-04T09:30", "ns")
+
+
+def test_minute_key_floors_before_epoch():
+    # 1970 年前是负数，整数下取整仍要落到分钟起点
+    ts = np.array(["1969-12-31T23:59:30"], dtype="datetime64[s]")
+    key, per_minute = minute_key(ts)
+    assert (key * per_minute).view(ts.dtype)[0] == np.datetime64("1969-12-31T23:59", "s")